@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark of the integration's commands against the fake SEMP server.
+
+Starts benchmarks/fake_semp.py at the requested scale, runs entrypoint.py once
+per command in a fresh process (with a fresh state directory unless --warm)
+and prints wall time, SEMP requests, peak RSS and output size per command.
+Results can be saved and compared against a previous run, exiting non-zero
+when a command regresses by more than --threshold.
+
+Usage:
+  python3 benchmarks/bench_commands.py [--vpns 5 --queues 1000 --clients 2000] [--latency 5]
+                                       [--commands queue-stats-all collect-all] [--repeat 3]
+                                       [--save baseline.json] [--compare baseline.json]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+import yaml
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENTRYPOINT = os.path.join(ROOT, 'src', 'entrypoint.py')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import fake_semp  # noqa: E402
+
+COMMANDS = [
+    'discover-vpns',
+    'discover-queues-all',
+    'discover-topic-endpoints-all',
+    'queue-stats-all',
+    'vpn-stats-all',
+    'bridge-stats-all',
+    'client-stats-all',
+    'collect-all',
+]
+METRICS = ('seconds', 'requests', 'peakrsskib', 'outputbytes')
+
+
+def run_command(command: str, config_path: str) -> Dict[str, Any]:
+    """Run one command in a child process and measure it with os.wait4"""
+    with tempfile.TemporaryFile() as output:
+        env = dict(os.environ, SOLACE_CONFIG_PATH=config_path)
+        started = time.perf_counter()
+        process = subprocess.Popen([sys.executable, ENTRYPOINT, command], stdout=output, env=env)
+        _, status, usage = os.wait4(process.pid, 0)
+        elapsed = time.perf_counter() - started
+        process.returncode = os.waitstatus_to_exitcode(status)
+        output.seek(0)
+        body = output.read()
+    try:
+        records = json.loads(body)
+    except ValueError:
+        records = None
+    return {
+        'seconds': elapsed,
+        'peakrsskib': usage.ru_maxrss,  # KiB on Linux
+        'outputbytes': len(body),
+        'records': len(records) if isinstance(records, list) else 0,
+        'error': records.get('error') if isinstance(records, dict) else None,
+        'exitcode': process.returncode,
+    }
+
+
+def benchmark(args: argparse.Namespace) -> Dict[str, Dict[str, Any]]:
+    semp = fake_semp.from_arguments(args)
+    server = fake_semp.start(semp)
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        config = {
+            'SOLACE_BASE_URL': f"http://127.0.0.1:{server.server_port}",
+            'SOLACE_USERNAME': 'bench',
+            'SOLACE_PASSWORD': 'bench',
+            'SOLACE_LOG_DIRECTORY': os.path.join(workdir, 'log'),
+            'SOLACE_LOG_LEVEL': 'WARNING',
+            'SOLACE_RATE_LIMIT': 0,  # Measure the integration, not the pacing
+        }
+        config.update(yaml.safe_load(args.config) if args.config else {})
+        for command in args.commands:
+            best = None
+            for attempt in range(args.repeat):
+                state = os.path.join(workdir, 'state' if args.warm else f"state-{command}-{attempt}")
+                config_path = os.path.join(workdir, 'config.yml')
+                with open(config_path, 'w') as f:
+                    yaml.safe_dump(dict(config, SOLACE_STATE_DIRECTORY=state), f)
+                requests_before = semp.request_count
+                result = run_command(command, config_path)
+                result['requests'] = semp.request_count - requests_before
+                if best is None or result['seconds'] < best['seconds']:
+                    best = result
+            results[command] = best
+    server.shutdown()
+    return results
+
+
+def report(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], threshold: float) -> List[str]:
+    """Print the results table and return the regressions against baseline"""
+    regressions = []
+    print(f"{'command':<30} {'seconds':>9} {'requests':>9} {'peak RSS KiB':>13} {'output bytes':>13} {'records':>8}")
+    for command, result in results.items():
+        line = (f"{command:<30} {result['seconds']:>9.3f} {result['requests']:>9} "
+                f"{result['peakrsskib']:>13} {result['outputbytes']:>13} {result['records']:>8}")
+        if result['error']:
+            line += f"  error: {result['error']}"
+        print(line)
+        previous = baseline.get(command)
+        if not previous:
+            continue
+        for metric in METRICS:
+            if previous.get(metric) and result[metric] > previous[metric] * (1 + threshold):
+                regressions.append(f"{command} {metric}: {previous[metric]} -> {result[metric]}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Command benchmarks against the fake SEMP server')
+    fake_semp.add_scale_arguments(parser)
+    parser.add_argument('--commands', nargs='+', default=COMMANDS, choices=COMMANDS, help='Commands to run')
+    parser.add_argument('--repeat', type=int, default=1, help='Runs per command, the fastest is reported')
+    parser.add_argument('--warm', action='store_true', help='Share one state directory (warm caches) across runs')
+    parser.add_argument('--config', default=None,
+                        help='Extra solace-env-config.yml settings as YAML, e.g. "{SOLACE_MAX_IN_FLIGHT: 1}"')
+    parser.add_argument('--save', default=None, help='Write the results to this JSON file')
+    parser.add_argument('--compare', default=None, help='Compare against results saved with --save')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Relative increase reported as a regression')
+    args = parser.parse_args()
+
+    results = benchmark(args)
+    baseline = {}
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+    regressions = report(results, baseline, args.threshold)
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2)
+    if regressions:
+        print('\nRegressions:')
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
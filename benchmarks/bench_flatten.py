@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark for key normalization and flattening.
+
+Flattens a batch of synthetic clients built from examples/client-stats.json
+with the original per-call normalize_key/flatten_dict (kept below as the
+"before" reference) and with nri_solace.flatten_item, and prints keys/sec.
+
+Usage:
+  python3 benchmarks/bench_flatten.py [--objects 10000] [--repeat 3]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, List, Union
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+import nri_solace  # noqa: E402
+
+
+def legacy_normalize_key(key: str) -> str:
+    """normalize_key as it was before the key translation cache"""
+    key = str(key).lower()
+    special_keys = {
+        'msgvpnname': 'vpnname',
+        'msgvpn': 'vpnname',
+        'vpnname': 'vpnname',
+        'queuename': 'queuename',
+        'queue': 'queuename',
+        'topicendpointname': 'topicendpointname',
+        'resourcetype': 'resourcetype',
+        'clientname': 'clientname',
+        'bridgename': 'bridgename'
+    }
+    normalized = special_keys.get(key.lower())
+    if normalized:
+        return normalized
+    import re
+    key = re.sub(r'[^a-z0-9]+', '_', key)
+    return key.strip('_')
+
+
+def legacy_flatten_dict(d: Union[Dict, List], parent_key: str = '', sep: str = '_') -> Dict[str, Any]:
+    """flatten_dict as it was before the single-pass flattener"""
+    items = []
+
+    def try_numeric(v):
+        if not isinstance(v, str):
+            return v
+        try:
+            if '.' in v:
+                return float(v)
+            return int(v)
+        except (ValueError, TypeError):
+            return v
+
+    if isinstance(d, list):
+        if not any(isinstance(x, (dict, list)) for x in d):
+            return {parent_key: [try_numeric(x) for x in d]} if parent_key else d
+        for i, item in enumerate(d):
+            new_key = f"{parent_key}{sep}{i}" if parent_key else str(i)
+            if isinstance(item, (dict, list)):
+                items.extend(legacy_flatten_dict(item, new_key, sep).items())
+            else:
+                items.append((new_key, try_numeric(item)))
+    elif isinstance(d, dict):
+        for k, v in d.items():
+            new_key = f"{parent_key}{sep}{legacy_normalize_key(k)}" if parent_key else legacy_normalize_key(k)
+            is_metric = any(x in k.lower() for x in ['count', 'rate', 'usage', 'size', 'byte', 'time', 'uptime', 'limit'])
+            if isinstance(v, (dict, list)):
+                items.extend(legacy_flatten_dict(v, new_key, sep).items())
+            else:
+                items.append((new_key, try_numeric(v) if is_metric else v))
+    else:
+        return {parent_key: try_numeric(d)} if parent_key else d
+    return dict(items)
+
+
+def legacy_pipeline(raw_items: List[Dict[str, Any]]) -> int:
+    """make_request normalization + flatten_dict + add_custom_attributes, as before"""
+    keys = 0
+    for item in raw_items:
+        flat = legacy_flatten_dict({legacy_normalize_key(k): v for k, v in item.items()})
+        flat = {legacy_normalize_key(k): v for k, v in flat.items()}
+        keys += len(flat)
+    return keys
+
+
+def current_pipeline(raw_items: List[Dict[str, Any]]) -> int:
+    """Schema-typed flatten_item + the add_custom_attributes check, as make_request does now"""
+    keys = 0
+    schema = nri_solace.ResourceSchema()
+    for item in raw_items:
+        flat = nri_solace.flatten_item(item, schema)
+        all(nri_solace.normalize_key(key) == key for key in flat)
+        keys += len(flat)
+    return keys
+
+
+def synthetic_clients(count: int) -> List[Dict[str, Any]]:
+    with open(os.path.join(ROOT, 'examples', 'client-stats.json'), 'r') as f:
+        template = json.load(f)['data'][0]
+    clients = []
+    for i in range(count):
+        client = dict(template)
+        client['clientName'] = f"client-{i}"
+        client['rxMsgCount'] = i
+        clients.append(client)
+    return clients
+
+
+def run(name: str, func, raw_items: List[Dict[str, Any]], repeat: int) -> float:
+    best = None
+    keys = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        keys = func(raw_items)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    rate = keys / best
+    print(f"{name:<8} {keys:>10} keys  {best * 1000:>9.1f} ms  {rate:>14,.0f} keys/sec")
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Key normalization and flattening microbenchmark')
+    parser.add_argument('--objects', type=int, default=10000, help='Number of synthetic clients')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per implementation, best is reported')
+    args = parser.parse_args()
+
+    raw_items = synthetic_clients(args.objects)
+    before = run('before', legacy_pipeline, raw_items, args.repeat)
+    after = run('after', current_pipeline, raw_items, args.repeat)
+    print(f"speedup  {after / before:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Startup-time benchmark of the entrypoint CLI.
+
+Runs entrypoint.py in fresh processes and reports, in milliseconds, the bare
+interpreter start, --help, snapshot without a daemon (neither needs SEMP) and
+the time from process start to the first SEMP request received by the fake
+server, with the parsed config sidecar removed (cold) and in place (warm).
+
+Usage:
+  python3 benchmarks/bench_startup.py [--repeat 10] [--command discover-vpns]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, List
+
+import yaml
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENTRYPOINT = os.path.join(ROOT, 'src', 'entrypoint.py')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+import fake_semp  # noqa: E402
+import nri_solace  # noqa: E402
+
+
+def run_to_exit(argv: List[str], env: dict) -> float:
+    started = time.perf_counter()
+    subprocess.run(argv, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, env=env)
+    return time.perf_counter() - started
+
+
+def run_to_first_request(argv: List[str], env: dict, semp: fake_semp.FakeSemp) -> float:
+    semp.first_request_at = None
+    started = time.perf_counter()
+    subprocess.run(argv, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, env=env)
+    if semp.first_request_at is None:
+        raise RuntimeError(f"{' '.join(argv)} did not reach the fake SEMP server")
+    return semp.first_request_at - started
+
+
+def measure(name: str, func: Callable[[], float], repeat: int) -> None:
+    samples = [func() * 1000 for _ in range(repeat)]
+    print(f"{name:<34} {statistics.median(samples):>9.1f} {min(samples):>9.1f} {max(samples):>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Entrypoint startup-time benchmark')
+    parser.add_argument('--repeat', type=int, default=10, help='Runs per measurement')
+    parser.add_argument('--command', default='discover-vpns', help='Command run to the first SEMP request')
+    args = parser.parse_args()
+
+    semp = fake_semp.FakeSemp()
+    server = fake_semp.start(semp)
+    with tempfile.TemporaryDirectory() as workdir:
+        config_path = os.path.join(workdir, 'solace-env-config.yml')
+        with open(config_path, 'w') as f:
+            yaml.safe_dump({
+                'SOLACE_BASE_URL': f"http://127.0.0.1:{server.server_port}",
+                'SOLACE_USERNAME': 'bench',
+                'SOLACE_PASSWORD': 'bench',
+                'SOLACE_LOG_DIRECTORY': os.path.join(workdir, 'log'),
+                'SOLACE_STATE_DIRECTORY': os.path.join(workdir, 'state'),
+                'SOLACE_DAEMON_SOCKET': os.path.join(workdir, 'missing.sock'),
+            }, f)
+        cache_directory = os.path.join(workdir, 'config-cache')
+        env = dict(os.environ, SOLACE_CONFIG_PATH=config_path, SOLACE_CONFIG_CACHE_DIRECTORY=cache_directory)
+        sidecar = os.path.join(cache_directory, os.path.basename(nri_solace.config_sidecar_path(config_path)))
+        command = [sys.executable, ENTRYPOINT]
+
+        def cold():
+            if os.path.exists(sidecar):
+                os.remove(sidecar)
+            return run_to_first_request(command + [args.command], env, semp)
+
+        print(f"{'ms':<34} {'median':>9} {'min':>9} {'max':>9}")
+        measure('python -c pass', lambda: run_to_exit([sys.executable, '-c', 'pass'], env), args.repeat)
+        measure('entrypoint.py --help', lambda: run_to_exit(command + ['--help'], env), args.repeat)
+        measure('entrypoint.py snapshot (no daemon)', lambda: run_to_exit(command + ['snapshot'], env), args.repeat)
+        measure('first request, cold config', cold, args.repeat)
+        measure('first request, cached config',
+                lambda: run_to_first_request(command + [args.command], env, semp), args.repeat)
+        if os.path.exists(sidecar):
+            os.remove(sidecar)
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
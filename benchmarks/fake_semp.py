@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Fake SEMP v2 monitor server for benchmarks and local testing.
+
+Serves VPNs, queues, topic endpoints, bridges and clients at a configurable
+scale, built from the examples/*.json responses (names and counters vary per
+object and counters grow over time). Supports count=/cursor paging, select=,
+where= conditions (==, !=, <, <=, >, >=, * and ? wildcards) and injected latency and errors. Also serves the broker object with a
+redundancyActivityStatus for HA active-node detection.
+
+Usage:
+  python3 benchmarks/fake_semp.py [--vpns 5] [--queues 1000] [--clients 2000]
+                                  [--latency 20] [--error-rate 0.01] [--port 8080]
+
+Then point SOLACE_BASE_URL at http://127.0.0.1:<port> (any username/password).
+"""
+import argparse
+import copy
+import fnmatch
+import json
+import operator
+import os
+import re
+import random
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EXAMPLES = os.path.join(ROOT, 'examples')
+MONITOR_PREFIX = '/SEMP/v2/monitor'
+MAX_PAGE_SIZE = 100  # SEMP caps count= at 100 for monitor collections
+WHERE_CONDITION = re.compile(r'^([A-Za-z][A-Za-z0-9]*)(==|!=|<=|>=|<|>)(.*)$')
+OPERATORS = {'==': operator.eq, '!=': operator.ne, '<': operator.lt, '<=': operator.le,
+             '>': operator.gt, '>=': operator.ge}
+
+# Used when an example file has no objects to copy
+FALLBACK_BRIDGE = {
+    'bridgeName': 'bridge', 'bridgeVirtualRouter': 'primary', 'msgVpnName': 'vpn',
+    'inboundState': 'ready-in-sync', 'outboundState': 'ready', 'remoteAddress': '10.0.0.1:55555',
+    'enabled': True, 'uptime': 3600, 'rxMsgCount': 0, 'txMsgCount': 0, 'rxByteCount': 0, 'txByteCount': 0,
+}
+
+
+def _example_objects(name: str) -> List[Dict[str, Any]]:
+    with open(os.path.join(EXAMPLES, name), 'r') as f:
+        data = json.load(f).get('data', [])
+    return data if isinstance(data, list) else [data]
+
+
+def _template(name: str, fallback: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """First non-system object of an example response"""
+    for obj in _example_objects(name):
+        if not any(str(value).startswith('#') for key, value in obj.items() if key.endswith('Name')):
+            return obj
+    objects = _example_objects(name)
+    if objects:
+        return objects[0]
+    return copy.deepcopy(fallback)
+
+
+class ResourceTemplate:
+    """Generates the objects of one resource type from an example object"""
+
+    def __init__(self, template: Dict[str, Any], name_field: str):
+        self.template = template
+        self.name_field = name_field
+        # Counters grow over time so delta computations see movement
+        self.counters = [key for key, value in template.items()
+                         if key.endswith('Count') and isinstance(value, int) and not isinstance(value, bool)]
+        self.rates = [key for key, value in template.items()
+                      if key.endswith('Rate') and isinstance(value, int) and not isinstance(value, bool)]
+
+    def build(self, vpn_name: str, name: str, index: int, ticks: int) -> Dict[str, Any]:
+        obj = dict(self.template)
+        obj['msgVpnName'] = vpn_name
+        obj[self.name_field] = name
+        for key in self.counters:
+            obj[key] = index * 10 + ticks
+        for key in self.rates:
+            obj[key] = index % 100
+        return obj
+
+
+class FakeSemp:
+    """The generated broker: object counts, templates and fault injection settings"""
+
+    def __init__(self, vpns: int = 2, queues: int = 100, topic_endpoints: int = 10, bridges: int = 2,
+                 clients: int = 100, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                 error_status: int = 503, counter_rate: float = 10.0, seed: Optional[int] = None):
+        self.counts = {'queues': queues, 'topicEndpoints': topic_endpoints, 'bridges': bridges, 'clients': clients}
+        self.vpn_names = [f"vpn-{i}" for i in range(vpns)]
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.counter_rate = counter_rate
+        self.started = time.monotonic()
+        self.random = random.Random(seed)
+        self.request_count = 0
+        self.first_request_at = None  # time.perf_counter() of the first request since it was last cleared
+        self._lock = threading.Lock()
+
+        queue = _template('queue-discovery.json')
+        topic_endpoint = {('topicEndpointName' if key == 'queueName' else key): value for key, value in queue.items()}
+        self.templates = {
+            'msgVpns': ResourceTemplate(_template('vpn-discovery.json'), 'msgVpnName'),
+            'vpnStats': ResourceTemplate(_template('vpn-stats.json'), 'msgVpnName'),
+            'queues': ResourceTemplate(queue, 'queueName'),
+            'topicEndpoints': ResourceTemplate(_template('topic-endpoint-discovery.json', topic_endpoint),
+                                               'topicEndpointName'),
+            'bridges': ResourceTemplate(_template('bridge-stats.json', FALLBACK_BRIDGE), 'bridgeName'),
+            'clients': ResourceTemplate(_template('client-stats.json'), 'clientName'),
+        }
+        self.templates['msgVpns'].template['state'] = 'up'
+        self.templates['vpnStats'].template['state'] = 'up'
+
+    def ticks(self) -> int:
+        return int((time.monotonic() - self.started) * self.counter_rate)
+
+    def object_name(self, collection: str, index: int) -> str:
+        return f"{collection[:-1].lower()}-{index}"
+
+    def collection(self, vpn_name: Optional[str], collection: str, start: int, count: int,
+                   where: Optional[List[Tuple[str, str, str]]] = None) -> Tuple[List[Dict[str, Any]], int]:
+        """One page of a collection (of the objects matching where) and the collection's total size"""
+        ticks = self.ticks()
+        if collection == 'msgVpns':
+            total = len(self.vpn_names)
+            names = self.vpn_names[start:start + count]
+            return [self.templates['msgVpns'].build(name, name, start + i, ticks) for i, name in enumerate(names)], total
+        template = self.templates[collection]
+        if not where:
+            total = self.counts[collection]
+            return [template.build(vpn_name, self.object_name(collection, index), index, ticks)
+                    for index in range(start, min(total, start + count))], total
+        objects = [template.build(vpn_name, self.object_name(collection, index), index, ticks)
+                   for index in range(self.counts[collection])]
+        objects = [obj for obj in objects if all(matches(obj, *condition) for condition in where)]
+        return objects[start:start + count], len(objects)
+
+    def single(self, vpn_name: str, collection: Optional[str], name: Optional[str]) -> Optional[Dict[str, Any]]:
+        """One object, or None when it does not exist"""
+        if vpn_name not in self.vpn_names:
+            return None
+        if collection is None:
+            return self.templates['vpnStats'].build(vpn_name, vpn_name, self.vpn_names.index(vpn_name), self.ticks())
+        prefix = f"{collection[:-1].lower()}-"
+        if collection not in self.counts or not name.startswith(prefix) or not name[len(prefix):].isdigit():
+            return None
+        index = int(name[len(prefix):])
+        if index >= self.counts[collection]:
+            return None
+        return self.templates[collection].build(vpn_name, name, index, self.ticks())
+
+
+def parse_where(where: str) -> Optional[List[Tuple[str, str, str]]]:
+    """(attribute, operator, value) of each comma-separated where= condition, None when one is invalid"""
+    conditions = [WHERE_CONDITION.match(condition) for condition in where.split(',') if condition]
+    return None if not all(conditions) else [condition.groups() for condition in conditions]
+
+
+def matches(obj: Dict[str, Any], attribute: str, op: str, value: str) -> bool:
+    actual = obj.get(attribute)
+    if actual is None:
+        return False
+    if isinstance(actual, bool):
+        return OPERATORS[op](actual, value == 'true')
+    if isinstance(actual, (int, float)):
+        return OPERATORS[op](actual, float(value))
+    if op in ('==', '!='):
+        return fnmatch.fnmatchcase(str(actual), value) == (op == '==')
+    return OPERATORS[op](str(actual), value)
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep-alive, like a real broker
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        semp = self.server.semp
+        with semp._lock:
+            semp.request_count += 1
+            if semp.first_request_at is None:
+                semp.first_request_at = time.perf_counter()
+            delay = max(0.0, semp.latency + semp.random.uniform(-semp.jitter, semp.jitter))
+            fail = semp.random.random() < semp.error_rate
+        if delay:
+            time.sleep(delay)
+        if fail:
+            return self.send({'meta': {'error': {'status': 'SERVICE_UNAVAILABLE'}, 'responseCode': semp.error_status}},
+                             semp.error_status)
+
+        url = urllib.parse.urlparse(self.path)
+        query = dict(urllib.parse.parse_qsl(url.query))
+        if not url.path.startswith(MONITOR_PREFIX):
+            return self.not_found()
+        parts = [urllib.parse.unquote(part) for part in url.path[len(MONITOR_PREFIX):].split('/') if part]
+
+        if not parts:
+            return self.send({'data': {'redundancyActivityStatus': self.server.redundancy}, 'meta': {'responseCode': 200}})
+        if parts[0] != 'msgVpns':
+            return self.not_found()
+        if len(parts) in (1, 3):
+            vpn_name = parts[1] if len(parts) == 3 else None
+            collection = parts[-1]
+            if collection not in semp.templates or (vpn_name is not None and vpn_name not in semp.vpn_names):
+                return self.not_found()
+            count = min(MAX_PAGE_SIZE, int(query.get('count', 10)))
+            start = int(query.get('cursor', 0))
+            where = parse_where(query.get('where', ''))
+            if where is None:
+                return self.send({'meta': {'error': {'status': 'INVALID_PARAMETER'}, 'responseCode': 400}}, 400)
+            items, total = semp.collection(vpn_name, collection, start, count, where)
+            meta = {'responseCode': 200, 'count': total}
+            if start + count < total:
+                next_query = dict(query, cursor=start + count)
+                meta['paging'] = {'cursorUri': f"http://{self.headers.get('Host')}{url.path}?{urllib.parse.urlencode(next_query)}"}
+            return self.send({'data': self.select(items, query), 'meta': meta})
+        if len(parts) in (2, 4):
+            obj = semp.single(parts[1], parts[2] if len(parts) == 4 else None, parts[3] if len(parts) == 4 else None)
+            if obj is None:
+                return self.not_found()
+            return self.send({'data': self.select([obj], query)[0], 'meta': {'responseCode': 200}})
+        return self.not_found()
+
+    @staticmethod
+    def select(items: List[Dict[str, Any]], query: Dict[str, str]) -> List[Dict[str, Any]]:
+        if 'select' not in query:
+            return items
+        fields = set(query['select'].split(','))
+        return [{key: value for key, value in item.items() if key in fields} for item in items]
+
+    def not_found(self):
+        self.send({'meta': {'error': {'status': 'NOT_FOUND'}, 'responseCode': 404}}, 404)
+
+    def send(self, body: Dict[str, Any], status: int = 200):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+def start(semp: FakeSemp, host: str = '127.0.0.1', port: int = 0, redundancy: str = 'local-active') -> ThreadingHTTPServer:
+    """Serve semp in a background thread; the bound port is server.server_port"""
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    server.semp = semp
+    server.redundancy = redundancy
+    threading.Thread(target=server.serve_forever, name='fake-semp', daemon=True).start()
+    return server
+
+
+def add_scale_arguments(parser: argparse.ArgumentParser) -> None:
+    """Scale and fault injection options, shared with the benchmark harness"""
+    parser.add_argument('--vpns', type=int, default=2, help='Number of message VPNs')
+    parser.add_argument('--queues', type=int, default=100, help='Queues per VPN')
+    parser.add_argument('--topic-endpoints', type=int, default=10, help='Topic endpoints per VPN')
+    parser.add_argument('--bridges', type=int, default=2, help='Bridges per VPN')
+    parser.add_argument('--clients', type=int, default=100, help='Clients per VPN')
+    parser.add_argument('--latency', type=float, default=0.0, help='Milliseconds added to every response')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Random +/- milliseconds on top of --latency')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests answered with --error-status')
+    parser.add_argument('--error-status', type=int, default=503, help='HTTP status of injected errors')
+    parser.add_argument('--seed', type=int, default=None, help='Seed for latency jitter and error injection')
+
+
+def from_arguments(args: argparse.Namespace) -> FakeSemp:
+    return FakeSemp(vpns=args.vpns, queues=args.queues, topic_endpoints=args.topic_endpoints,
+                    bridges=args.bridges, clients=args.clients, latency=args.latency / 1000.0,
+                    jitter=args.jitter / 1000.0, error_rate=args.error_rate, error_status=args.error_status,
+                    seed=args.seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fake SEMP v2 monitor server')
+    add_scale_arguments(parser)
+    parser.add_argument('--host', default='127.0.0.1', help='Address to listen on')
+    parser.add_argument('--port', type=int, default=8080, help='Port to listen on')
+    parser.add_argument('--redundancy', default='local-active', help='redundancyActivityStatus of the broker object')
+    args = parser.parse_args()
+
+    semp = from_arguments(args)
+    server = start(semp, args.host, args.port, args.redundancy)
+    print(f"Fake SEMP serving {len(semp.vpn_names)} VPNs on http://{args.host}:{server.server_port}{MONITOR_PREFIX}")
+    try:
+        while True:
+            time.sleep(60)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
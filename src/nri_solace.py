@@ -0,0 +1,3053 @@
+"""New Relic Solace integration: SEMP v2 collection for nri-flex, run through entrypoint.py"""
+from __future__ import annotations  # requests is imported lazily, annotations must not evaluate it
+
+import os
+import sys
+import json
+import argparse
+import array
+import contextlib
+import fnmatch
+import functools
+import hashlib
+import heapq
+import io
+import itertools
+import math
+import operator
+import re
+import signal
+import socket
+import socketserver
+import stat
+import threading
+import time
+import types
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Callable, Iterator, List, Optional, Tuple, Union
+from urllib.parse import quote, unquote
+import logging
+import queue
+import random
+
+# Constants
+CONFIG_PATH = os.environ.get("SOLACE_CONFIG_PATH", "/usr/bin/solace-env-config.yml")  # Overridable for local runs and benchmarks
+DEFAULT_PAGE_SIZE = 100  # SEMP monitor collections return 10 items per page unless count= is sent
+DEFAULT_QUEUE_STATS_MODE = "bulk"
+DEFAULT_MAX_IN_FLIGHT = 4  # Concurrent SEMP requests per broker
+DEFAULT_REQUEST_TIMEOUT = 30  # Seconds to wait for a SEMP response
+DEFAULT_RATE_LIMIT = 20  # SEMP requests per second per broker (token bucket), 0 disables
+DEFAULT_LATENCY_TARGET = 2.0  # Seconds; slower responses shrink the concurrency limit
+THROTTLE_STATUSES = (429, 503)  # Responses of an overloaded management plane
+DEFAULT_RETRIES = 2  # Retries of a SEMP request after a transient failure
+DEFAULT_RETRY_BACKOFF = 0.5  # Seconds; base of the jittered exponential backoff
+DEFAULT_RETRY_MAX_BACKOFF = 10  # Seconds; longest wait between two attempts
+RETRY_STATUSES = (429, 500, 502, 503, 504)  # Transient HTTP errors worth retrying
+DEFAULT_BREAKER_THRESHOLD = 3  # Consecutive failed cycles before a VPN is skipped
+DEFAULT_BREAKER_COOLDOWN = 300  # Seconds a failing VPN is skipped before it is tried again
+ERROR_SUMMARY_MAX_LENGTH = 4000  # Characters of error detail in the error summary record
+# Upper bounds (seconds) of the SEMP latency histogram buckets in the self-metrics
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+DEFAULT_CYCLE_BUDGET = 50  # Seconds a collection cycle may take (Flex times out at 60), 0 disables
+# Share of a collect-all cycle's budget each command may use before it is stopped,
+# so the lowest priority resources are dropped first when a cycle runs late
+COMMAND_BUDGET_SHARES = {
+    'client-stats-all': 0.6,
+    'bridge-stats-all': 0.8,
+    'discover-topic-endpoints-all': 0.8,
+}
+# SEMP collection name -> resource type used by per-resource settings such as SOLACE_SELECT_FIELDS
+RESOURCE_TYPES = {
+    'msgVpns': 'vpn',
+    'queues': 'queue',
+    'topicEndpoints': 'topicendpoint',
+    'bridges': 'bridge',
+    'clients': 'client',
+}
+
+# SEMP attributes always added to a select= allowlist: object identity plus the
+# fields the integration itself relies on (get_vpns filters on state)
+SELECT_IDENTITY_FIELDS = {
+    'vpn': ('msgVpnName', 'state'),
+    'queue': ('msgVpnName', 'queueName'),
+    'topicendpoint': ('msgVpnName', 'topicEndpointName'),
+    'bridge': ('msgVpnName', 'bridgeName', 'bridgeVirtualRouter'),
+    'client': ('msgVpnName', 'clientName'),
+}
+
+DEFAULT_STATE_DIRECTORY = "/var/db/newrelic-infra/nri-solace"  # Persisted state between invocations
+# Private directory of the parsed config sidecar; the config is read before its own settings are known
+CONFIG_CACHE_DIRECTORY = os.environ.get("SOLACE_CONFIG_CACHE_DIRECTORY", os.path.join(DEFAULT_STATE_DIRECTORY, "config"))
+DEFAULT_CACHE_MAX_ENTRIES = 100000  # Object lists larger than this are not cached
+DEFAULT_CACHE_MAX_BYTES = 50 * 1024 * 1024  # Cache files larger than this are dropped
+
+# Cumulative SEMP counters turned into per-interval deltas and per-second rates, per resource type
+DEFAULT_DELTA_COUNTERS = {
+    'vpn': ['rxmsgcount', 'txmsgcount', 'rxbytecount', 'txbytecount', 'datarxmsgcount', 'datatxmsgcount',
+            'datarxbytecount', 'datatxbytecount', 'discardedrxmsgcount', 'discardedtxmsgcount'],
+    'queue': ['spooledmsgcount', 'spooledbytecount', 'deletedmsgcount', 'redeliveredmsgcount',
+              'bindrequestcount', 'bindsuccesscount'],
+    'topicendpoint': ['spooledmsgcount', 'spooledbytecount', 'deletedmsgcount', 'redeliveredmsgcount',
+                      'bindrequestcount', 'bindsuccesscount'],
+    'bridge': ['rxmsgcount', 'txmsgcount', 'rxbytecount', 'txbytecount'],
+    'client': ['rxmsgcount', 'txmsgcount', 'rxbytecount', 'txbytecount', 'datarxbytecount', 'datatxbytecount',
+               'rxdiscardedmsgcount', 'txdiscardedmsgcount'],
+}
+
+# Attribute naming an object of each resource type within its VPN
+NAME_FIELDS = {
+    'vpn': 'vpnname',
+    'queue': 'queuename',
+    'topicendpoint': 'topicendpointname',
+    'bridge': 'bridgename',
+    'client': 'clientname',
+}
+
+# Commands whose records carry live counters, and the resource type of those records
+STATS_COMMAND_RESOURCES = {
+    'vpn-stats-all': 'vpn',
+    'queue-stats-all': 'queue',
+    'discover-topic-endpoints-all': 'topicendpoint',
+    'bridge-stats-all': 'bridge',
+    'client-stats-all': 'client',
+}
+
+# Comparison operators of a SEMP where= condition, e.g. msgSpoolUsage>0
+WHERE_CONDITION = re.compile(r'^\s*([A-Za-z][A-Za-z0-9]*)\s*(==|!=|<=|>=|<|>)\s*(.*?)\s*$')
+WHERE_OPERATORS = {'==': operator.eq, '!=': operator.ne, '<': operator.lt, '<=': operator.le,
+                   '>': operator.gt, '>=': operator.ge}
+# Rollups: attributes aggregated per resource type when SOLACE_ROLLUPS is true,
+# and the attributes whose values each get their own rollup series
+DEFAULT_ROLLUP_FIELDS = {
+    'queue': ['msgspoolusage', 'spooledmsgcount', 'rxmsgrate', 'txmsgrate', 'rxbyterate', 'txbyterate'],
+    'topicendpoint': ['msgspoolusage', 'spooledmsgcount', 'rxmsgrate', 'txmsgrate'],
+    'client': ['rxmsgrate', 'txmsgrate', 'rxbyterate', 'txbyterate'],
+}
+DEFAULT_ROLLUP_GROUP_BY = {
+    'client': ['clientusername'],
+}
+ROLLUP_PERCENTILES = (50, 95, 99)
+DEFAULT_CLIENT_TOP_K = 100  # Clients with the highest byte rate emitted per cycle with churn tracking
+DEFAULT_CLIENT_INDEX_MAX_ENTRIES = 100000  # Clients remembered by churn tracking
+# SEMP client attributes churn tracking reads, added to a client select= allowlist
+CLIENT_CHURN_FIELDS = ['clientUsername', 'clientAddress', 'uptime', 'rxByteCount', 'txByteCount',
+                       'rxByteRate', 'txByteRate']
+DEFAULT_CHANGE_MAX_ENTRIES = 200000  # Digests kept by change-only emission
+DEFAULT_CHANGE_HEARTBEAT_CYCLES = 12  # Re-emit everything every N cycles (1 minute at 5s)
+# Attributes that change on every cycle without a metric changing
+DEFAULT_CHANGE_IGNORE_FIELDS = ['uptime', 'deltaintervalseconds']
+
+# Where HA redundancy status is read from: the broker object's activity status.
+# Configurable because the attribute depends on the broker release.
+DEFAULT_HA_STATUS_ENDPOINT = ""
+DEFAULT_HA_STATUS_FIELD = "redundancyActivityStatus"
+DEFAULT_HA_ACTIVE_VALUES = ['local-active']
+BROKER_QUEUE_SIZE = 1000  # Records buffered between broker collectors and the output writer
+VPN_PAGE_BUFFER = 2  # SEMP pages a VPN collected ahead of the output may buffer
+
+DEFAULT_DAEMON_SOCKET = "/tmp/nri-solace.sock"
+DEFAULT_DAEMON_INTERVAL = 5  # Seconds between daemon collection cycles
+CYCLE_COMMANDS = ('collect-all', 'daemon')  # Commands that run every collection in one cycle
+
+# Normalized queue attributes a queue-stats record must carry. The msgVpns/{vpn}/queues
+# collection returns the same monitor attributes as msgVpns/{vpn}/queues/{queue}, so
+# bulk mode only falls back to a per-queue request when one of these is missing.
+QUEUE_STATS_FIELDS = (
+    'queuename',
+    'vpnname',
+    'spooledmsgcount',
+    'spooledbytecount',
+    'msgspoolusage',
+    'rxmsgrate',
+    'txmsgrate',
+    'averagerxmsgrate',
+    'averagetxmsgrate',
+    'txunackedmsgcount',
+    'redeliveredmsgcount',
+)
+
+def format_json_for_log(obj: Any) -> str:
+    """
+    Format a JSON-serializable object for logging with pretty printing.
+    Makes logs more human-readable in debug mode.
+    """
+    try:
+        return json.dumps(obj, indent=2, sort_keys=True)
+    except Exception as e:
+        logging.warning(f"Could not pretty-print JSON for logs: {e}")
+        return str(obj)
+
+def initialize_logging(config: Dict[str, Any]):
+    """
+    Initialize logging to write to a file.
+    Uses the log settings of the loaded solace-env-config.yml if available.
+    """
+    # Default values
+    log_directory = "/var/log/newrelic-solace"
+    log_level = logging.INFO
+    
+    # Get log directory from config if available
+    config_log_dir = config.get('SOLACE_LOG_DIRECTORY')
+    if config_log_dir:
+        log_directory = config_log_dir
+        
+    # Get log level from config if available
+    config_log_level = str(config.get('SOLACE_LOG_LEVEL', 'INFO')).upper()
+    log_level_map = {
+        'DEBUG': logging.DEBUG,
+        'INFO': logging.INFO,
+        'WARNING': logging.WARNING,
+        'ERROR': logging.ERROR,
+        'CRITICAL': logging.CRITICAL
+    }
+    log_level = log_level_map.get(config_log_level, logging.INFO)
+
+    log_file = os.path.join(log_directory, "entrypoint.log")
+    
+    # Ensure log directory exists
+    try:
+        if not os.path.exists(log_directory):
+            os.makedirs(log_directory)
+    except Exception:
+        # If we can't create the directory, fall back to /tmp
+        log_directory = "/tmp"
+        log_file = os.path.join(log_directory, "newrelic-solace.log")
+    
+    # Set up file handler
+    file_handler = logging.FileHandler(log_file, mode='a')
+    file_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+    
+    # Get the root logger
+    root_logger = logging.getLogger()
+    root_logger.setLevel(log_level)  # Set log level from config
+    
+    # Remove existing handlers (to avoid duplicate logging)
+    for handler in root_logger.handlers[:]:
+        root_logger.removeHandler(handler)
+    
+    # Add our file handler
+    root_logger.addHandler(file_handler)
+    
+    # Log initialization
+    logging.info("Logging initialized to %s with level %s", log_file, 
+                 logging.getLevelName(root_logger.getEffectiveLevel()))
+
+def private_directory(path: str) -> bool:
+    """
+    Create path as a directory only this user can access (0700). False when
+    it cannot be created or already exists but belongs to someone else.
+    """
+    try:
+        os.makedirs(path, mode=0o700, exist_ok=True)
+        info = os.lstat(path)
+        if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid():
+            return False
+        if info.st_mode & 0o077:
+            os.chmod(path, 0o700)
+        return True
+    except OSError:
+        return False
+
+def replace_file(path: str, payload: str) -> None:
+    """
+    Atomically replace path with payload, through a mkstemp file in the same
+    directory: unpredictable, created exclusively and readable only by this user.
+    """
+    import tempfile
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix='.tmp', dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.unlink(tmp_path)
+        raise
+
+def config_sidecar_path(path: str) -> str:
+    """JSON copy of a parsed config file, in CONFIG_CACHE_DIRECTORY"""
+    digest = hashlib.blake2b(os.path.abspath(path).encode(), digest_size=8).hexdigest()
+    return os.path.join(CONFIG_CACHE_DIRECTORY, f"config-{digest}.json")
+
+def read_config(path: str = CONFIG_PATH) -> Dict[str, Any]:
+    """
+    Parse solace-env-config.yml. The parsed result is kept in a JSON sidecar
+    keyed by the file's mtime and size, so later invocations skip importing
+    yaml and parsing the file until it changes. The sidecar holds the
+    credentials too, so it is only used in a private directory of this user
+    and is written mode 0600; without one the file is parsed every time.
+    """
+    info = os.stat(path)
+    sidecar = config_sidecar_path(path)
+    use_sidecar = private_directory(os.path.dirname(sidecar))
+    if use_sidecar:
+        try:
+            with open(os.open(sidecar, os.O_RDONLY | os.O_NOFOLLOW), 'r') as f:
+                # Only trust a sidecar written by this user, it decides where credentials are sent
+                if os.fstat(f.fileno()).st_uid == os.getuid():
+                    cached = json.load(f)
+                    if cached.get('mtime_ns') == info.st_mtime_ns and cached.get('size') == info.st_size:
+                        return cached['config']
+        except (OSError, ValueError, KeyError, AttributeError):
+            pass
+    
+    import yaml
+    with open(path, 'r') as f:
+        config = yaml.safe_load(f) or {}
+    if use_sidecar:
+        try:
+            replace_file(sidecar, json.dumps({'mtime_ns': info.st_mtime_ns, 'size': info.st_size, 'config': config}))
+        except (OSError, TypeError, ValueError):
+            pass  # Not JSON-serializable (e.g. YAML dates) or not writable: parse every time
+    return config
+
+def load_config():
+    """
+    Load configuration from solace-env-config.yml
+    Returns the loaded config or empty dict if not found
+    """
+    try:
+        return read_config()
+    except Exception as e:
+        logging.error(f"Failed to load config: {e}")
+        return {}
+
+requests = None  # Bound by import_http()
+
+def import_http():
+    """
+    Import requests (and urllib3) on first use: they are most of the startup
+    time, and argument errors, --help and snapshot never need them.
+    """
+    global requests
+    import requests
+    import urllib3
+    # Disable SSL warnings
+    urllib3.disable_warnings()
+
+# Special handling for specific keys to ensure consistency
+SPECIAL_KEYS = {
+    'msgvpnname': 'vpnname',
+    'msgvpn': 'vpnname',
+    'vpnname': 'vpnname',
+    'queuename': 'queuename',
+    'queue': 'queuename',
+    'topicendpointname': 'topicendpointname',
+    'resourcetype': 'resourcetype',
+    'clientname': 'clientname',
+    'bridgename': 'bridgename'
+}
+
+# Key substrings marking a field as a metric whose string values are converted to numbers
+METRIC_KEY_PARTS = ('count', 'rate', 'usage', 'size', 'byte', 'time', 'uptime', 'limit')
+
+NON_ALNUM_PATTERN = re.compile(r'[^a-z0-9]+')
+
+# SEMP resources share a few thousand distinct attribute names, so a bounded cache
+# turns normalization into a dictionary lookup after the first page
+KEY_CACHE_SIZE = 8192
+
+@functools.lru_cache(maxsize=KEY_CACHE_SIZE)
+def translate_key(key: str) -> Tuple[str, bool]:
+    """
+    Translate a raw SEMP key into its normalized name and whether it is a metric.
+    Results are memoized, so each distinct key is only processed once per process.
+    """
+    lowered = str(key).lower()
+    normalized = SPECIAL_KEYS.get(lowered)
+    if not normalized:
+        # Replace any sequences of non-alphanumeric chars with underscore
+        # and remove leading/trailing underscores
+        normalized = NON_ALNUM_PATTERN.sub('_', lowered).strip('_')
+    is_metric = any(part in lowered for part in METRIC_KEY_PARTS)
+    return normalized, is_metric
+
+def normalize_key(key: str) -> str:
+    """Normalize a dictionary key to be lowercase and valid for New Relic"""
+    return translate_key(key)[0]
+
+def try_numeric(v):
+    """Convert string values to numbers if they represent numeric values"""
+    if not isinstance(v, str):
+        return v
+    try:
+        if '.' in v:
+            return float(v)
+        return int(v)
+    except (ValueError, TypeError):
+        return v
+
+def _flatten_into(out: Dict[str, Any], d: Union[Dict, List], parent_key: str, sep: str) -> None:
+    """Single-pass flattening of d into out, normalizing keys through translate_key"""
+    if isinstance(d, dict):
+        for k, v in d.items():
+            name, is_metric = translate_key(k)
+            new_key = f"{parent_key}{sep}{name}" if parent_key else name
+            if isinstance(v, (dict, list)):
+                _flatten_into(out, v, new_key, sep)
+            else:
+                # Check if this is a known metric field that should be numeric
+                out[new_key] = try_numeric(v) if is_metric else v
+        return
+    
+    # If it's just a simple list of primitives, don't flatten
+    if not any(isinstance(x, (dict, list)) for x in d):
+        if parent_key:
+            out[parent_key] = [try_numeric(x) for x in d]
+        return
+    # Otherwise flatten each item, treating each index as a key
+    for i, item in enumerate(d):
+        new_key = f"{parent_key}{sep}{i}" if parent_key else str(i)
+        if isinstance(item, (dict, list)):
+            _flatten_into(out, item, new_key, sep)
+        else:
+            out[new_key] = try_numeric(item)
+
+def flatten_dict(d: Union[Dict, List], parent_key: str = '', sep: str = '_') -> Dict[str, Any]:
+    """
+    Recursively flatten a nested dictionary or list.
+    Handles both dictionaries and lists, normalizing keys for New Relic compatibility.
+    Preserves numeric types (int, float) for metric values.
+    
+    Args:
+        d: The dictionary or list to flatten
+        parent_key: The base key to prepend to flattened keys
+        sep: The separator to use between nested key levels
+    
+    Returns:
+        A flattened dictionary with normalized keys and preserved numeric types
+    """
+    if isinstance(d, list) and not parent_key and not any(isinstance(x, (dict, list)) for x in d):
+        return d
+    if not isinstance(d, (dict, list)):
+        return {parent_key: try_numeric(d)} if parent_key else d
+    items: Dict[str, Any] = {}
+    _flatten_into(items, d, parent_key, sep)
+    return items
+
+INT_PATTERN = re.compile(r'[+-]?[0-9]+')
+FLOAT_PATTERN = re.compile(r'[+-]?([0-9]+\.[0-9]*|\.[0-9]+)([eE][+-]?[0-9]+)?')
+
+# Attributes that identify or describe an object: always kept as strings, since
+# a VPN or queue named "1001" must not turn into a number
+IDENTITY_KEYS = frozenset(NAME_FIELDS.values()) | {'description', 'clientusername', 'clientid'}
+
+def is_identity_key(key: str) -> bool:
+    return key in IDENTITY_KEYS or key.endswith(('name', 'address', 'description'))
+
+class ResourceSchema:
+    """
+    Field types of one resource type, keyed by flattened attribute name. A kind
+    is 'int' or 'float' for attributes delivered as numeric strings and 'str'
+    for everything else. Kinds come from the SEMP spec or are learned from the
+    first value of a metric attribute, so string values are converted with a
+    precomputed converter instead of being trial-parsed on every cycle.
+    Identity attributes are never typed and other attributes are only typed
+    by the spec.
+    """
+    CONVERTERS = {'int': int, 'float': float}
+
+    def __init__(self, kinds: Optional[Dict[str, str]] = None):
+        # Identity attributes may have been typed by an older schema.json
+        self.kinds = {key: kind for key, kind in (kinds or {}).items() if not is_identity_key(key)}
+        self.dirty = False
+
+    def learn(self, key: str, value: str) -> str:
+        """Classify a key from the shape of its first string value"""
+        if INT_PATTERN.fullmatch(value):
+            kind = 'int'
+        elif FLOAT_PATTERN.fullmatch(value):
+            kind = 'float'
+        else:
+            kind = 'str'
+        self.kinds[key] = kind
+        self.dirty = True
+        return kind
+
+    def convert(self, key: str, value: str, is_metric: bool = True) -> Any:
+        """Convert a string value according to its key's kind, learning unknown metric keys"""
+        if is_identity_key(key):
+            return value
+        kind = self.kinds.get(key)
+        if kind is None:
+            if not is_metric:
+                return value
+            kind = self.learn(key, value)
+        if kind == 'str':
+            return value
+        try:
+            return self.CONVERTERS[kind](value)
+        except ValueError:
+            if kind == 'int' and FLOAT_PATTERN.fullmatch(value):
+                # Widen rather than give up on a numeric attribute
+                logging.debug(f"Schema widening {key} to float for {value!r}")
+                self.kinds[key] = 'float'
+                self.dirty = True
+                return float(value)
+            # The attribute is not numeric after all, stop converting it
+            logging.debug(f"Schema drift on {key}: {value!r} is not {kind}")
+            self.kinds[key] = 'str'
+            self.dirty = True
+            return value
+
+def _flatten_typed_into(out: Dict[str, Any], d: Union[Dict, List], parent_key: str, schema: ResourceSchema) -> None:
+    """Single-pass flattening of d into out, converting string values through schema"""
+    if isinstance(d, dict):
+        for k, v in d.items():
+            name, is_metric = translate_key(k)
+            new_key = f"{parent_key}_{name}" if parent_key else name
+            if isinstance(v, (dict, list)):
+                _flatten_typed_into(out, v, new_key, schema)
+            elif isinstance(v, str):
+                out[new_key] = schema.convert(new_key, v, is_metric)
+            else:
+                out[new_key] = v
+        return
+    
+    is_metric = translate_key(parent_key)[1]
+    if not any(isinstance(x, (dict, list)) for x in d):
+        if parent_key:
+            out[parent_key] = [schema.convert(parent_key, x, is_metric) if isinstance(x, str) else x for x in d]
+        return
+    for i, item in enumerate(d):
+        new_key = f"{parent_key}_{i}" if parent_key else str(i)
+        if isinstance(item, (dict, list)):
+            _flatten_typed_into(out, item, new_key, schema)
+        elif isinstance(item, str):
+            out[new_key] = schema.convert(new_key, item, is_metric)
+        else:
+            out[new_key] = item
+
+def flatten_item(item: Dict[str, Any], schema: Optional[ResourceSchema] = None) -> Dict[str, Any]:
+    """
+    Flatten one SEMP object into a dictionary with normalized keys in a single pass.
+    With a schema, string values are typed by the schema instead of by key name.
+    """
+    flat: Dict[str, Any] = {}
+    if schema is not None:
+        _flatten_typed_into(flat, item, '', schema)
+    else:
+        _flatten_into(flat, item, '', '_')
+    return flat
+
+def resource_for_endpoint(endpoint: str) -> Optional[str]:
+    """
+    Map a SEMP monitor endpoint to its resource type, e.g. 'msgVpns/x/queues'
+    and 'msgVpns/x/queues/y' are both 'queue'. Collection names sit at even
+    path positions, object names at odd ones.
+    """
+    segments = endpoint.strip('/').split('/')
+    last_collection = segments[(len(segments) - 1) // 2 * 2]
+    return RESOURCE_TYPES.get(last_collection)
+
+def vpn_for_endpoint(endpoint: str) -> str:
+    """The VPN a SEMP monitor endpoint belongs to, '' for broker-level endpoints"""
+    segments = endpoint.strip('/').split('/')
+    if segments[0] == 'msgVpns' and len(segments) > 1:
+        return unquote(segments[1])
+    return ''
+
+def record_category(record: Dict[str, Any]) -> str:
+    """The resource type of an output record, from the object name it carries"""
+    for resource_type in ('queue', 'topicendpoint', 'bridge', 'client', 'vpn'):
+        if NAME_FIELDS[resource_type] in record:
+            return resource_type
+    return 'other'
+
+def print_json_and_exit(data, exit_code=0):
+    """Print data as JSON and exit with given code"""
+    # Ensure we're handling empty results properly
+    if data is None or (isinstance(data, dict) and not data) or (isinstance(data, list) and len(data) == 0):
+        print(json.dumps({}))
+        sys.exit(exit_code)
+    
+    # Format the output like Cohesity example:
+    # Output everything as a single JSON array or object
+    if isinstance(data, list):
+        # Already a list, just output as JSON
+        print(json.dumps(data))
+    elif isinstance(data, dict):
+        # Single dictionary
+        print(json.dumps(data))
+    else:
+        # Any other value - wrap in a simple object
+        print(json.dumps({"value": data}))
+        
+    sys.exit(exit_code)
+
+def state_directory(config: Dict[str, Any]) -> str:
+    """
+    Directory for state persisted between invocations, from SOLACE_STATE_DIRECTORY.
+    Falls back to the temp directory when it cannot be created.
+    """
+    directory = config.get('SOLACE_STATE_DIRECTORY', DEFAULT_STATE_DIRECTORY)
+    try:
+        os.makedirs(directory, exist_ok=True)
+    except OSError as e:
+        import tempfile
+        # The temp directory is shared, so only reuse a fallback no one else can have prepared
+        fallback = os.path.join(tempfile.gettempdir(), f"nri-solace-{os.getuid()}")
+        if not private_directory(fallback):
+            fallback = tempfile.mkdtemp(prefix='nri-solace-')
+        logging.warning(f"Cannot use state directory {directory} ({e}), using {fallback}")
+        directory = fallback
+    return directory
+
+def load_brokers(config: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Connection settings of every broker to collect: the SOLACE_BROKERS list, or
+    the single broker given by SOLACE_BASE_URL. Broker entries inherit the
+    top-level credentials, timeout, in-flight and rate limits they do not set.
+    """
+    defaults = {
+        'name': config.get('SOLACE_BROKER_NAME'),
+        'base_url': config.get('SOLACE_BASE_URL'),
+        'username': config.get('SOLACE_USERNAME'),
+        'password': config.get('SOLACE_PASSWORD'),
+        'timeout': config.get('SOLACE_TIMEOUT', DEFAULT_REQUEST_TIMEOUT),
+        'max_in_flight': config.get('SOLACE_MAX_IN_FLIGHT', DEFAULT_MAX_IN_FLIGHT),
+        'rate_limit': config.get('SOLACE_RATE_LIMIT', DEFAULT_RATE_LIMIT),
+        'ha_group': None,
+        'state_directory': state_directory(config),
+    }
+    configured = config.get('SOLACE_BROKERS')
+    if not configured:
+        return [defaults]
+    
+    brokers = []
+    for entry in configured:
+        broker = dict(defaults)
+        broker.update({str(key).lower(): value for key, value in (entry or {}).items()})
+        broker['name'] = str(broker.get('name') or broker.get('base_url'))
+        # Brokers share VPN and object names, so each keeps its state in its own directory
+        subdirectory = NON_ALNUM_PATTERN.sub('_', broker['name'].lower()).strip('_')
+        broker['state_directory'] = os.path.join(defaults['state_directory'], subdirectory)
+        os.makedirs(broker['state_directory'], exist_ok=True)
+        brokers.append(broker)
+    names = [broker['name'] for broker in brokers]
+    if len(set(names)) != len(names):
+        logging.warning(f"SOLACE_BROKERS has duplicate broker names, their state will be shared: {names}")
+    return brokers
+
+def load_state(directory: str, name: str, default: Any = None) -> Any:
+    """Load a JSON state file, returning default when it is missing or unreadable"""
+    path = os.path.join(directory, name)
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+    except (OSError, ValueError) as e:
+        logging.warning(f"Discarding unreadable state file {path}: {e}")
+        return default
+
+def state_name(name: str, command: Optional[str] = None) -> str:
+    """
+    File name of a state file rewritten every cycle. Commands run by Flex as
+    separate processes share the state directory, so a single command keeps
+    its own copy (e.g. digests-queue-stats-all.json) instead of overwriting
+    the others'; collect-all and the daemon use the plain name.
+    """
+    if not command or command in CYCLE_COMMANDS:
+        return name
+    stem, extension = os.path.splitext(name)
+    return f"{stem}-{command}{extension}"
+
+def save_state(directory: str, name: str, data: Any) -> int:
+    """Atomically write a JSON state file and return its size in bytes"""
+    path = os.path.join(directory, name)
+    payload = json.dumps(data, separators=(',', ':'))
+    try:
+        replace_file(path, payload)
+    except OSError as e:
+        logging.warning(f"Could not write state file {path}: {e}")
+    return len(payload)
+
+class DiscoveryCache:
+    """
+    On-disk cache of slow-changing object lists (VPNs, queues, topic endpoints),
+    one file per resource type with an entry per VPN. An entry is reused until
+    its resource type's TTL expires or, with the "count" strategy, until the
+    VPN-level signature it was stored with changes. Entries over max_entries
+    objects are not cached and files over max_bytes are dropped.
+    """
+
+    def __init__(self, directory: str, ttls: Dict[str, float], strategy: str = 'ttl',
+                 max_entries: int = DEFAULT_CACHE_MAX_ENTRIES, max_bytes: int = DEFAULT_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.ttls = {str(resource_type).lower(): float(ttl) for resource_type, ttl in ttls.items()}
+        self.strategy = strategy
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._files = {}  # resource type -> {key: entry}, loaded lazily
+        self._dirty = set()
+        self._lock = threading.Lock()
+
+    def enabled(self, resource_type: str) -> bool:
+        return self.ttls.get(resource_type, 0) > 0
+
+    def _entries(self, resource_type: str) -> Dict[str, Any]:
+        if resource_type not in self._files:
+            self._files[resource_type] = load_state(self.directory, f"discovery-{resource_type}.json", {})
+        return self._files[resource_type]
+
+    def get(self, resource_type: str, key: str, signature: Optional[list] = None) -> Optional[List[Dict[str, Any]]]:
+        """Return a copy of the cached objects, or None when missing or no longer valid"""
+        if not self.enabled(resource_type):
+            return None
+        with self._lock:
+            entry = self._entries(resource_type).get(key)
+        if not entry or time.time() - entry['time'] > self.ttls[resource_type]:
+            return None
+        if self.strategy == 'count' and signature is not None and entry.get('signature') != signature:
+            logging.debug(f"Cached {resource_type} list for {key or 'broker'} invalidated by count change")
+            return None
+        return [dict(item) for item in entry['items']]
+
+    def put(self, resource_type: str, key: str, items: List[Dict[str, Any]], signature: Optional[list] = None) -> None:
+        if not self.enabled(resource_type):
+            return
+        with self._lock:
+            entries = self._entries(resource_type)
+            if len(items) > self.max_entries:
+                logging.info(f"Not caching {len(items)} {resource_type} objects for {key or 'broker'}, over {self.max_entries}")
+                entries.pop(key, None)
+            else:
+                entries[key] = {'time': time.time(), 'signature': signature, 'items': items}
+            self._dirty.add(resource_type)
+
+    def flush(self) -> None:
+        """Write changed resource types back to disk"""
+        with self._lock:
+            for resource_type in self._dirty:
+                name = f"discovery-{resource_type}.json"
+                size = save_state(self.directory, name, self._files[resource_type])
+                if size > self.max_bytes:
+                    logging.info(f"Dropping {name}: {size} bytes is over {self.max_bytes}")
+                    self._files[resource_type] = {}
+                    save_state(self.directory, name, {})
+            self._dirty.clear()
+
+# SEMP monitor spec definitions of the resource types the integration collects
+SPEC_DEFINITIONS = {
+    'MsgVpn': 'vpn',
+    'MsgVpnQueue': 'queue',
+    'MsgVpnTopicEndpoint': 'topicendpoint',
+    'MsgVpnBridge': 'bridge',
+    'MsgVpnClient': 'client',
+}
+
+class SchemaRegistry:
+    """
+    Per-resource ResourceSchemas, persisted to schema.json in the state
+    directory so field types are learned once rather than on every run.
+    """
+    SPEC_KINDS = {'integer': 'int', 'number': 'float', 'string': 'str'}
+
+    def __init__(self, directory: str, command: Optional[str] = None):
+        self.directory = directory
+        self.filename = state_name('schema.json', command)
+        self.schemas = {resource_type: ResourceSchema(kinds)
+                        for resource_type, kinds in load_state(directory, self.filename, {}).items()}
+        self._lock = threading.Lock()
+
+    def for_resource(self, resource_type: Optional[str]) -> ResourceSchema:
+        resource_type = resource_type or 'other'
+        with self._lock:
+            if resource_type not in self.schemas:
+                self.schemas[resource_type] = ResourceSchema()
+            return self.schemas[resource_type]
+
+    def bootstrap_from_spec(self, spec: Dict[str, Any]) -> None:
+        """Seed missing resource schemas from the property types of the SEMP monitor spec"""
+        definitions = spec.get('definitions', {})
+        for definition, resource_type in SPEC_DEFINITIONS.items():
+            if resource_type in self.schemas or definition not in definitions:
+                continue
+            schema = self.for_resource(resource_type)
+            for name, prop in definitions[definition].get('properties', {}).items():
+                key = normalize_key(name)
+                ref = prop.get('$ref', '')
+                if ref:
+                    # Nested objects such as event thresholds are flattened as <key>_<property>
+                    nested = definitions.get(ref.rsplit('/', 1)[-1], {}).get('properties', {})
+                    for nested_name, nested_prop in nested.items():
+                        kind = self.SPEC_KINDS.get(nested_prop.get('type'))
+                        if kind:
+                            schema.kinds[f"{key}_{normalize_key(nested_name)}"] = kind
+                elif self.SPEC_KINDS.get(prop.get('type')):
+                    schema.kinds[key] = self.SPEC_KINDS[prop.get('type')]
+            schema.dirty = True
+            logging.info(f"Bootstrapped {len(schema.kinds)} {resource_type} field types from the SEMP spec")
+
+    def flush(self) -> None:
+        """Write the schemas back to disk when any of them learned new fields"""
+        with self._lock:
+            if not any(schema.dirty for schema in self.schemas.values()):
+                return
+            save_state(self.directory, self.filename,
+                       {resource_type: schema.kinds for resource_type, schema in self.schemas.items()})
+            for schema in self.schemas.values():
+                schema.dirty = False
+
+def object_key(resource_type: str, record: Dict[str, Any]) -> str:
+    """Identity of a record within its resource type: VPN name and object name"""
+    return f"{record.get('vpnname', '')}\t{record.get(NAME_FIELDS[resource_type], '')}"
+
+class DeltaEngine:
+    """
+    Turns cumulative SEMP counters into per-interval deltas and per-second
+    rates. The previous sample of every (vpnname, resource, name) is kept as
+    [timestamp, counter values...] and persisted to delta-<resource>.json, so
+    rates survive between invocations. A counter lower than its previous value
+    is treated as a reset and objects missing from a cycle are evicted when the
+    cycle is flushed, so apply() can be called once per batch. With max_age
+    (scheduled collection, where objects are not sampled every cycle) samples
+    are merged instead and only evicted once older than max_age seconds.
+    """
+
+    def __init__(self, directory: str, counters: Dict[str, List[str]], max_age: Optional[float] = None):
+        self.directory = directory
+        self.counters = counters
+        self.max_age = max_age
+        self._samples = {}  # resource type -> {object key: [timestamp, values...]}
+        self._current = {}  # Samples taken during the running cycle
+        self._kept = set()  # VPNs that failed this cycle, their previous samples are carried over
+        self._lock = threading.Lock()
+
+    def _load(self, resource_type: str) -> Dict[str, list]:
+        if resource_type not in self._samples:
+            state = load_state(self.directory, f"delta-{resource_type}.json", {})
+            # Samples taken with a different counter list cannot be compared
+            if state.get('counters') != self.counters[resource_type]:
+                state = {}
+            self._samples[resource_type] = state.get('samples', {})
+        return self._samples[resource_type]
+
+    def apply(self, resource_type: str, records: List[Dict[str, Any]], now: Optional[float] = None) -> None:
+        """Add <counter>_delta and <counter>_persec to records that have a previous sample"""
+        counters = self.counters.get(resource_type)
+        if not counters:
+            return
+        now = time.time() if now is None else now
+        with self._lock:
+            previous = self._load(resource_type)
+            current = self._current.setdefault(resource_type, {})
+            for record in records:
+                key = object_key(resource_type, record)
+                values = [record.get(counter) for counter in counters]
+                current[key] = [now] + values
+                sample = previous.get(key)
+                if not sample or now <= sample[0]:
+                    continue
+                elapsed = now - sample[0]
+                record['deltaintervalseconds'] = round(elapsed, 3)
+                for counter, value, last in zip(counters, values, sample[1:]):
+                    if not isinstance(value, (int, float)) or not isinstance(last, (int, float)):
+                        continue
+                    delta = value - last
+                    if delta < 0:
+                        # Counters restart from zero, e.g. after a broker restart or a clear-stats
+                        delta = value
+                        record['counterreset'] = True
+                    record[f"{counter}_delta"] = delta
+                    record[f"{counter}_persec"] = round(delta / elapsed, 3)
+
+    def keep(self, vpn_name: str) -> None:
+        """
+        Carry the previous samples of a VPN that could not be collected into
+        this cycle. Merged when the cycle is flushed, so it does not matter
+        whether other VPNs were sampled before or after the failure.
+        """
+        with self._lock:
+            self._kept.add(vpn_name)
+
+    def flush(self) -> None:
+        """End the cycle: keep only objects sampled in it (or kept) and persist them"""
+        with self._lock:
+            for resource_type, current in self._current.items():
+                for key, sample in self._samples.get(resource_type, {}).items():
+                    if key.split('\t', 1)[0] in self._kept:
+                        current.setdefault(key, sample)
+                if self.max_age is None:
+                    # Replacing the table evicts objects that no longer exist
+                    self._samples[resource_type] = current
+                    continue
+                cutoff = time.time() - self.max_age
+                samples = self._load(resource_type)
+                samples.update(current)
+                self._samples[resource_type] = {key: sample for key, sample in samples.items() if sample[0] >= cutoff}
+            self._current = {}
+            self._kept = set()
+            for resource_type, samples in self._samples.items():
+                save_state(self.directory, f"delta-{resource_type}.json",
+                           {'counters': self.counters[resource_type], 'samples': samples})
+
+class ChangeFilter:
+    """
+    Change-only emission: keeps a digest of every object's attributes and drops
+    records whose digest matches the previous cycle, except on heartbeat cycles
+    when everything is emitted. The digest table is an LRU bounded by
+    max_entries and is persisted to digests.json together with the cycle number.
+    """
+
+    def __init__(self, directory: str, resource_types: List[str], heartbeat_cycles: int,
+                 max_entries: int = DEFAULT_CHANGE_MAX_ENTRIES, ignore_fields: Optional[List[str]] = None,
+                 command: Optional[str] = None):
+        self.directory = directory
+        self.filename = state_name('digests.json', command)
+        self.resource_types = set(resource_types)
+        self.heartbeat_cycles = max(1, heartbeat_cycles)
+        self.max_entries = max_entries
+        self.ignore_fields = set(ignore_fields if ignore_fields is not None else DEFAULT_CHANGE_IGNORE_FIELDS)
+        state = load_state(directory, self.filename, {})
+        self.cycle = state.get('cycle', 0)
+        self._digests = OrderedDict(state.get('digests', {}))
+        self._lock = threading.Lock()
+
+    def _digest(self, record: Dict[str, Any]) -> str:
+        # Derived delta attributes follow the counters they are computed from
+        values = sorted((key, value) for key, value in record.items()
+                        if key not in self.ignore_fields and not key.endswith(('_delta', '_persec')))
+        return hashlib.blake2b(repr(values).encode(), digest_size=8).hexdigest()
+
+    def apply(self, resource_type: str, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Return the records that changed since the previous cycle, or all of them on a heartbeat"""
+        if resource_type not in self.resource_types:
+            return records
+        heartbeat = self.cycle % self.heartbeat_cycles == 0
+        changed = []
+        with self._lock:
+            for record in records:
+                key = f"{resource_type}\t{object_key(resource_type, record)}"
+                digest = self._digest(record)
+                if heartbeat or self._digests.get(key) != digest:
+                    changed.append(record)
+                self._digests[key] = digest
+                self._digests.move_to_end(key)
+            while len(self._digests) > self.max_entries:
+                self._digests.popitem(last=False)
+        logging.debug(f"Change-only {resource_type}: emitting {len(changed)} of {len(records)} records"
+                      f"{' (heartbeat)' if heartbeat else ''}")
+        return changed
+
+    def flush(self) -> None:
+        """End the cycle and persist the digest table"""
+        with self._lock:
+            self.cycle += 1
+            save_state(self.directory, self.filename, {'cycle': self.cycle, 'digests': self._digests})
+
+class RecordFilter:
+    """
+    Filter rules of one resource type from SOLACE_FILTERS: SEMP where=
+    conditions, matched all (default) or any, and an optional top-N by an
+    attribute. Conditions that must all hold are pushed down to the broker as
+    where=; every condition is also checked on the flattened records, which
+    covers 'any' rules (SEMP where= has no OR) and the per-object paths. Top-N
+    keeps the records with the largest top_by values of each batch (VPN).
+    """
+
+    def __init__(self, resource_type: str, rule: Dict[str, Any]):
+        self.resource_type = resource_type
+        conditions = rule.get('where') or []
+        self.conditions = [conditions] if isinstance(conditions, str) else list(conditions)
+        self.match_all = str(rule.get('match', 'all')).lower() != 'any'
+        self.top = int(rule['top']) if rule.get('top') else None
+        self.top_by = rule.get('top_by')
+        if self.top and not self.top_by:
+            raise ValueError(f"top requires top_by for {resource_type}")
+        # Compiled once: (flattened key, comparison, value) per condition
+        self._predicates = [self._compile(condition) for condition in self.conditions]
+
+    @staticmethod
+    def _compile(condition: str) -> Tuple[str, Callable[[Any, Any], bool], Any]:
+        match = WHERE_CONDITION.match(condition)
+        if not match:
+            raise ValueError(f"invalid filter condition: {condition}")
+        attribute, op, value = match.groups()
+        value = value.strip('"\'')
+        if value.lower() in ('true', 'false'):
+            return normalize_key(attribute), WHERE_OPERATORS[op], value.lower() == 'true'
+        value = try_numeric(value)
+        if isinstance(value, str) and op in ('==', '!=') and any(char in value for char in '*?'):
+            # SEMP where= treats * and ? in string values as wildcards
+            wanted = op == '=='
+            return normalize_key(attribute), lambda actual, pattern: fnmatch.fnmatchcase(str(actual), pattern) == wanted, value
+        return normalize_key(attribute), WHERE_OPERATORS[op], value
+
+    @property
+    def attributes(self) -> List[str]:
+        """SEMP attributes the rules read, needed in a select= allowlist"""
+        attributes = [WHERE_CONDITION.match(condition).group(1) for condition in self.conditions]
+        return attributes + ([self.top_by] if self.top_by else [])
+
+    @property
+    def pushdown(self) -> Optional[str]:
+        """where= value sent to the broker, None when the rules can only be applied locally"""
+        if self.match_all and self.conditions:
+            return ','.join(''.join(WHERE_CONDITION.match(condition).groups()) for condition in self.conditions)
+        return None
+
+    def _matches(self, record: Dict[str, Any]) -> bool:
+        results = []
+        for key, compare, value in self._predicates:
+            actual = record.get(key)
+            try:
+                results.append(actual is not None and compare(actual, value))
+            except TypeError:
+                results.append(False)  # e.g. a string attribute compared with a number
+        return all(results) if self.match_all else any(results)
+
+    def apply(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """The records matching the rules, the top-N of them when top is set"""
+        if self._predicates:
+            records = [record for record in records if self._matches(record)]
+        if self.top and len(records) > self.top:
+            top_by = normalize_key(self.top_by)
+
+            def rank(record):
+                value = record.get(top_by)
+                return value if isinstance(value, (int, float)) else float('-inf')
+
+            records = heapq.nlargest(self.top, records, key=rank)
+        return records
+
+class RollupEngine:
+    """
+    VPN- and broker-level aggregates of stats records. Each batch is turned
+    into one array('d') column per rolled-up attribute, per VPN and group-by
+    value; at the end of the cycle every column yields its sum, max and
+    percentiles (with NumPy when it is installed), and the VPN columns are
+    concatenated for the broker totals. Reported as SolaceRollup records.
+    """
+
+    def __init__(self, fields: Dict[str, List[str]], group_by: Dict[str, List[str]]):
+        self.fields = fields
+        self.group_by = group_by
+        self._columns = {}  # (resource type, VPN, group values) -> {'objectcount': n, attribute: array('d')}
+        self._lock = threading.Lock()
+        try:
+            import numpy
+            self._numpy = numpy
+        except ImportError:
+            self._numpy = None
+
+    def observe(self, resource_type: str, records: List[Dict[str, Any]]) -> None:
+        """Append a batch of records to the columns of their VPN and group"""
+        fields = self.fields.get(resource_type)
+        if not fields or not records:
+            return
+        group_by = self.group_by.get(resource_type, [])
+        groups = {}
+        for record in records:
+            groups.setdefault((record.get('vpnname', ''), tuple(str(record.get(field, '')) for field in group_by)),
+                              []).append(record)
+        with self._lock:
+            for (vpn_name, group), members in groups.items():
+                columns = self._columns.setdefault((resource_type, vpn_name, group), {'objectcount': 0})
+                columns['objectcount'] += len(members)
+                for field in fields:
+                    # Attributes that are missing or not numeric are left out of the column
+                    values = [record[field] for record in members
+                              if isinstance(record.get(field), (int, float)) and not isinstance(record.get(field), bool)]
+                    columns.setdefault(field, array.array('d')).extend(values)
+
+    def _stats(self, values: array.array) -> Dict[str, float]:
+        if not values:
+            return {}
+        if self._numpy is not None:
+            column = self._numpy.frombuffer(values, dtype=self._numpy.float64)
+            total, peak = float(column.sum()), float(column.max())
+            percentiles = [float(value) for value in self._numpy.percentile(column, ROLLUP_PERCENTILES)]
+        else:
+            ordered = sorted(values)
+            total, peak = math.fsum(ordered), ordered[-1]
+            percentiles = []
+            for percentile in ROLLUP_PERCENTILES:
+                # Linear interpolation between closest ranks, as numpy.percentile does
+                rank = (len(ordered) - 1) * percentile / 100
+                low = int(rank)
+                high = min(low + 1, len(ordered) - 1)
+                percentiles.append(ordered[low] + (ordered[high] - ordered[low]) * (rank - low))
+        stats = {'sum': total, 'max': peak}
+        stats.update((f"p{percentile}", value) for percentile, value in zip(ROLLUP_PERCENTILES, percentiles))
+        return stats
+
+    def _record(self, resource_type: str, scope: str, vpn_name: Optional[str], group: Tuple[str, ...],
+                columns: Dict[str, Any]) -> Dict[str, Any]:
+        record = {'event_type': 'SolaceRollup', 'category': resource_type, 'scope': scope}
+        if vpn_name is not None:
+            record['vpnname'] = vpn_name
+        record.update(zip(self.group_by.get(resource_type, []), group))
+        record['objectcount'] = columns['objectcount']
+        for field in self.fields[resource_type]:
+            for stat, value in self._stats(columns.get(field, array.array('d'))).items():
+                record[f"{field}_{stat}"] = round(value, 6)
+        return record
+
+    def records(self) -> List[Dict[str, Any]]:
+        """One record per VPN and group, then one per group for the whole broker"""
+        records = []
+        broker = {}
+        with self._lock:
+            for (resource_type, vpn_name, group), columns in sorted(self._columns.items()):
+                records.append(self._record(resource_type, 'vpn', vpn_name, group, columns))
+                totals = broker.setdefault((resource_type, group), {'objectcount': 0})
+                totals['objectcount'] += columns['objectcount']
+                for field in self.fields[resource_type]:
+                    totals.setdefault(field, array.array('d')).extend(columns.get(field, ()))
+        for (resource_type, group), columns in sorted(broker.items()):
+            records.append(self._record(resource_type, 'broker', None, group, columns))
+        return records
+
+    def reset(self) -> None:
+        with self._lock:
+            self._columns = {}
+
+class ClientState:
+    """What the churn index remembers of one connected client"""
+    __slots__ = ('connected_at', 'last_seen', 'username', 'rx_bytes', 'tx_bytes')
+
+    def __init__(self, connected_at: float, last_seen: float, username: str, rx_bytes: int, tx_bytes: int):
+        self.connected_at = connected_at
+        self.last_seen = last_seen
+        self.username = username
+        self.rx_bytes = rx_bytes
+        self.tx_bytes = tx_bytes
+
+class ClientChurn:
+    """
+    Client churn tracking in place of the full client dump: an index of every
+    connected client (VPN and client name -> ClientState) yields connect events
+    for clients not in it and disconnect events for clients of a fully
+    collected VPN that are no longer listed, and only the top_k clients by
+    rx + tx byte rate are emitted as client records. The index is an LRU
+    bounded by max_entries and is persisted to clients.json.
+    """
+
+    def __init__(self, directory: str, top_k: int = DEFAULT_CLIENT_TOP_K,
+                 max_entries: int = DEFAULT_CLIENT_INDEX_MAX_ENTRIES):
+        self.directory = directory
+        self.top_k = top_k
+        self.max_entries = max_entries
+        state = load_state(directory, 'clients.json', None)
+        # Without a previous index every client would look newly connected
+        self.primed = state is not None
+        self._index = OrderedDict(
+            (key, ClientState(*values)) for key, values in ((state or {}).get('clients') or {}).items()
+        )
+        self._lock = threading.Lock()
+        self.start_cycle()
+
+    def start_cycle(self) -> None:
+        with self._lock:
+            self.cycle_started = time.time()
+            self._events = []
+            self._complete_vpns = set()  # VPNs whose whole client list was seen this cycle
+            self._top = []  # Min-heap of (byte rate, sequence, record)
+            self._sequence = 0
+            self._evicted = 0
+
+    def observe(self, vpn_name: str, clients: List[Dict[str, Any]], complete: bool = True) -> None:
+        """Update the index from a VPN's client list, complete unless it was fetched with a where= filter"""
+        now = time.time()
+        with self._lock:
+            for client in clients:
+                client_name = client.get('clientname')
+                if not client_name:
+                    continue
+                key = f"{vpn_name}\t{client_name}"
+                state = self._index.get(key)
+                uptime = client.get('uptime')
+                has_uptime = isinstance(uptime, (int, float))
+                connected_at = now - uptime if has_uptime else now
+                # A client that reconnected under the same name since it was last seen counts as new
+                # (uptime has a resolution of one second)
+                if state is None or (has_uptime and connected_at > state.last_seen + 1):
+                    if state is not None:
+                        self._events.append(self._disconnect(key, state))
+                    username = sys.intern(str(client.get('clientusername', '')))
+                    state = self._index[key] = ClientState(connected_at, now, username, 0, 0)
+                    if self.primed:
+                        self._events.append({
+                            'event_type': 'SolaceClientChurn', 'churn': 'connect', 'vpnname': vpn_name,
+                            'clientname': client_name, 'clientusername': state.username,
+                            'clientaddress': client.get('clientaddress'), 'uptime': uptime,
+                        })
+                state.last_seen = now
+                state.rx_bytes = client.get('rxbytecount', state.rx_bytes)
+                state.tx_bytes = client.get('txbytecount', state.tx_bytes)
+                self._index.move_to_end(key)
+            while len(self._index) > self.max_entries:
+                self._index.popitem(last=False)
+                self._evicted += 1
+            if complete:
+                self._complete_vpns.add(vpn_name)
+
+    def _disconnect(self, key: str, state: ClientState) -> Dict[str, Any]:
+        vpn_name, client_name = key.split('\t', 1)
+        return {
+            'event_type': 'SolaceClientChurn', 'churn': 'disconnect', 'vpnname': vpn_name,
+            'clientname': client_name, 'clientusername': state.username,
+            'connectedseconds': round(state.last_seen - state.connected_at, 3), 'lastseen': round(state.last_seen, 3),
+            'rxbytecount': state.rx_bytes, 'txbytecount': state.tx_bytes,
+        }
+
+    def rank(self, records: List[Dict[str, Any]]) -> None:
+        """Keep the records with the highest rx + tx byte rate seen this cycle"""
+        with self._lock:
+            for record in records:
+                rate = sum(value for value in (record.get('rxbyterate'), record.get('txbyterate'))
+                           if isinstance(value, (int, float)))
+                self._sequence += 1
+                entry = (rate, self._sequence, record)
+                if len(self._top) < self.top_k:
+                    heapq.heappush(self._top, entry)
+                elif entry > self._top[0]:
+                    heapq.heapreplace(self._top, entry)
+
+    def records(self) -> List[Dict[str, Any]]:
+        """The cycle's connect and disconnect events, then the top clients by byte rate"""
+        with self._lock:
+            gone = [key for key, state in self._index.items()
+                    if state.last_seen < self.cycle_started and key.split('\t', 1)[0] in self._complete_vpns]
+            for key in gone:
+                self._events.append(self._disconnect(key, self._index.pop(key)))
+            if self._evicted:
+                logging.warning(f"Client index full ({self.max_entries} clients), "
+                                f"{self._evicted} forgotten without a disconnect event")
+            records = self._events
+            top = sorted(self._top, reverse=True)
+            self._events, self._top = [], []
+        for position, (_, _, record) in enumerate(top, 1):
+            record['event_type'] = 'SolaceClientMetrics'
+            record['resourcetype'] = 'client'
+            record['byterank'] = position
+            records.append(record)
+        return records
+
+    def flush(self) -> None:
+        """Persist the index"""
+        with self._lock:
+            self.primed = True
+            clients = {key: [state.connected_at, state.last_seen, state.username, state.rx_bytes, state.tx_bytes]
+                       for key, state in self._index.items()}
+        save_state(self.directory, 'clients.json', {'clients': clients})
+
+def load_rollups(configured: Union[bool, Dict[str, Any]]) -> Optional[RollupEngine]:
+    """
+    RollupEngine for SOLACE_ROLLUPS: true uses the default attributes, a mapping
+    of resource type -> {fields, group_by} replaces them. None when disabled.
+    """
+    if not configured:
+        return None
+    if configured is True:
+        return RollupEngine(DEFAULT_ROLLUP_FIELDS, DEFAULT_ROLLUP_GROUP_BY)
+    fields, group_by = {}, {}
+    for resource_type, rule in configured.items():
+        resource_type = str(resource_type).lower()
+        if resource_type not in STATS_COMMAND_RESOURCES.values():
+            logging.warning(f"Ignoring rollup for unknown resource type: {resource_type}")
+            continue
+        rule = rule or {}
+        fields[resource_type] = [normalize_key(field) for field in rule.get('fields') or DEFAULT_ROLLUP_FIELDS.get(resource_type, [])]
+        group_by[resource_type] = [normalize_key(field) for field in rule.get('group_by') or []]
+    return RollupEngine(fields, group_by)
+
+def load_filters(configured: Dict[str, Any]) -> Dict[str, RecordFilter]:
+    """SOLACE_FILTERS: resource type -> RecordFilter, invalid rules are logged and skipped"""
+    filters = {}
+    for resource_type, rule in configured.items():
+        resource_type = str(resource_type).lower()
+        if resource_type not in STATS_COMMAND_RESOURCES.values() or resource_type == 'vpn':
+            logging.warning(f"Ignoring filter for unsupported resource type: {resource_type}")
+            continue
+        try:
+            filters[resource_type] = RecordFilter(resource_type, rule or {})
+        except (ValueError, TypeError) as e:
+            logging.warning(f"Ignoring filter for {resource_type}: {e}")
+    return filters
+
+def join_where(*conditions: Optional[str]) -> Optional[str]:
+    """Combine where= values; SEMP requires every comma-separated condition to hold"""
+    return ','.join(condition for condition in conditions if condition) or None
+
+class CircuitBreaker:
+    """
+    Per-VPN circuit breaker. A VPN with a failed request in threshold
+    consecutive cycles is skipped for cooldown seconds and then tried again:
+    one good cycle closes the breaker, another failure re-opens it. State is
+    persisted to breakers.json so it spans invocations.
+    """
+
+    def __init__(self, directory: str, threshold: int = DEFAULT_BREAKER_THRESHOLD,
+                 cooldown: float = DEFAULT_BREAKER_COOLDOWN, command: Optional[str] = None):
+        self.directory = directory
+        self.filename = state_name('breakers.json', command)
+        self.threshold = max(1, threshold)
+        self.cooldown = cooldown
+        self._state = load_state(directory, self.filename, {})  # VPN -> {'failures', 'opened'}
+        self._attempted = set()  # VPNs collected in the running cycle
+        self._failed = set()  # VPNs with a failed request in the running cycle
+        self._lock = threading.Lock()
+
+    def allow(self, vpn_name: str) -> bool:
+        """Whether vpn_name may be collected, False while its breaker is open"""
+        with self._lock:
+            opened = self._state.get(vpn_name, {}).get('opened')
+            if opened and time.time() - opened < self.cooldown:
+                return False
+            self._attempted.add(vpn_name)
+            return True
+
+    def failure(self, vpn_name: str) -> None:
+        with self._lock:
+            self._failed.add(vpn_name)
+
+    def flush(self) -> None:
+        """End the cycle: count failed cycles per VPN, open or close breakers and persist them"""
+        with self._lock:
+            for vpn_name in self._attempted:
+                if vpn_name not in self._failed:
+                    self._state.pop(vpn_name, None)
+                    continue
+                state = self._state.setdefault(vpn_name, {'failures': 0, 'opened': None})
+                state['failures'] += 1
+                if state['failures'] >= self.threshold:
+                    state['opened'] = time.time()
+                    logging.warning(f"VPN {vpn_name} failed {state['failures']} cycles in a row, "
+                                    f"skipping it for {self.cooldown:.0f}s")
+            self._attempted = set()
+            self._failed = set()
+            save_state(self.directory, self.filename, self._state)
+
+class SelfMetrics:
+    """
+    Instrumentation of the integration itself: per broker, endpoint category
+    and VPN, the SEMP requests issued, their latency histogram and response
+    bytes, the time they waited for the rate and concurrency limits (pacing)
+    and in retry backoff, and the time spent flattening and serializing
+    records. Reported as SolaceIntegrationSelfMetrics records at the end of
+    every cycle.
+    """
+
+    def __init__(self):
+        self._series = {}  # (broker, category, VPN) -> counters
+        self._lock = threading.Lock()
+
+    def _get(self, key: Tuple[str, str, str]) -> Dict[str, Any]:
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = {
+                'requestcount': 0, 'responsebytes': 0, 'latencysumseconds': 0.0, 'latencymaxseconds': 0.0,
+                'buckets': [0] * len(LATENCY_BUCKETS), 'pacingseconds': 0.0, 'backoffseconds': 0.0,
+                'recordcount': 0, 'flattenseconds': 0.0, 'serializeseconds': 0.0,
+            }
+        return series
+
+    def observe_request(self, broker: Optional[str], category: str, vpn_name: str, latency: float,
+                        response_bytes: int, pacing: float = 0.0, backoff: float = 0.0) -> None:
+        with self._lock:
+            series = self._get((broker or '', category, vpn_name))
+            series['requestcount'] += 1
+            series['responsebytes'] += response_bytes
+            series['pacingseconds'] += pacing
+            series['backoffseconds'] += backoff
+            series['latencysumseconds'] += latency
+            series['latencymaxseconds'] = max(series['latencymaxseconds'], latency)
+            for index, bound in enumerate(LATENCY_BUCKETS):
+                if latency <= bound:
+                    series['buckets'][index] += 1
+
+    def observe_flatten(self, broker: Optional[str], category: str, vpn_name: str,
+                        seconds: float, records: int) -> None:
+        with self._lock:
+            series = self._get((broker or '', category, vpn_name))
+            series['flattenseconds'] += seconds
+            series['recordcount'] += records
+
+    def observe_serialize(self, record: Dict[str, Any], seconds: float) -> None:
+        category = record_category(record)
+        # Keyed like the request that returned the record: VPN summaries (marked isActive
+        # by get_vpns) come from the broker-level VPN listing
+        vpn_name = '' if category == 'vpn' and 'isActive' in record else record.get('vpnname', '')
+        key = (record.get('brokername', ''), category, vpn_name)
+        with self._lock:
+            self._get(key)['serializeseconds'] += seconds
+
+    def records(self) -> List[Dict[str, Any]]:
+        """One record per series, latency buckets counted cumulatively like Prometheus histograms"""
+        records = []
+        with self._lock:
+            for (broker, category, vpn_name), series in sorted(self._series.items()):
+                record = {'event_type': 'SolaceIntegrationSelfMetrics', 'category': category, 'vpnname': vpn_name}
+                if broker:
+                    record['brokername'] = broker
+                for field in ('requestcount', 'responsebytes', 'recordcount'):
+                    record[field] = series[field]
+                for field in ('latencysumseconds', 'latencymaxseconds', 'pacingseconds', 'backoffseconds',
+                              'flattenseconds', 'serializeseconds'):
+                    record[field] = round(series[field], 6)
+                for bound, count in zip(LATENCY_BUCKETS, series['buckets']):
+                    record[f"latency_le_{bound:g}".replace('.', '_')] = count
+                records.append(record)
+        return records
+
+    def reset(self) -> None:
+        with self._lock:
+            self._series = {}
+
+@contextlib.contextmanager
+def profiling(mode: Optional[str], directory: str, command: str) -> Iterator[None]:
+    """
+    Optional offline analysis of a run: 'cprofile' dumps cProfile stats
+    (readable with pstats or snakeviz) and 'tracemalloc' dumps a memory
+    snapshot and logs the top allocation sites, both into directory.
+    """
+    if mode not in ('cprofile', 'tracemalloc'):
+        yield
+        return
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{command}-{time.strftime('%Y%m%d-%H%M%S')}")
+    if mode == 'cprofile':
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            profiler.dump_stats(f"{path}.pstats")
+            logging.info(f"cProfile stats written to {path}.pstats")
+    else:
+        import tracemalloc
+        tracemalloc.start(25)
+        try:
+            yield
+        finally:
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            snapshot.dump(f"{path}.tracemalloc")
+            logging.info(f"tracemalloc snapshot written to {path}.tracemalloc "
+                         f"(current {current / 1024:.0f} KiB, peak {peak / 1024:.0f} KiB)")
+            for stat in snapshot.statistics('lineno')[:10]:
+                logging.info(f"tracemalloc: {stat}")
+
+class Scheduler:
+    """
+    Tiered collection: decides which units of work, a command for one VPN
+    (optionally restricted to the objects matching a name pattern), are due
+    in a cycle. A unit with an interval of I seconds runs once per window of
+    I seconds. Windows are shifted by a stable hash of the unit, so units
+    sharing an interval fall due in different cycles instead of all at once.
+    The window each unit last ran in is persisted to schedule.json.
+    """
+
+    def __init__(self, directory: str, intervals: Dict[str, float], patterns: List[Dict[str, Any]]):
+        self.directory = directory
+        self.intervals = {command: float(interval) for command, interval in intervals.items()}
+        self.patterns = {}  # command -> [(name pattern, interval)]
+        for rule in patterns:
+            command = rule.get('command')
+            if command not in STATS_COMMAND_RESOURCES or command == 'vpn-stats-all':
+                logging.warning(f"Ignoring schedule pattern for {command}: patterns apply to object stats commands")
+                continue
+            self.patterns.setdefault(command, []).append((str(rule['pattern']), float(rule['interval'])))
+        self._windows = load_state(directory, 'schedule.json', {})
+        self._checked = {}  # Units evaluated this cycle and their current window
+        self._lock = threading.Lock()
+
+    @property
+    def longest_interval(self) -> float:
+        intervals = list(self.intervals.values()) + [interval for rules in self.patterns.values() for _, interval in rules]
+        return max(intervals, default=0.0)
+
+    def due(self, unit: str, interval: float, now: Optional[float] = None) -> bool:
+        """Whether unit has not run yet in its current window"""
+        if interval <= 0:
+            return True
+        now = time.time() if now is None else now
+        offset = int(hashlib.blake2b(unit.encode(), digest_size=4).hexdigest(), 16) % int(interval * 1000) / 1000
+        window = int((now + offset) // interval)
+        with self._lock:
+            self._checked[unit] = window
+        return self._windows.get(unit) != window
+
+    def work(self, command: str, vpns: List[Dict[str, Any]]) -> List[Tuple[Optional[str], List[Dict[str, Any]]]]:
+        """
+        The (name pattern, VPNs) pairs of command that are due this cycle. A None
+        pattern is the full collection; pattern units are only listed for VPNs
+        whose full collection is not due, since it already covers them.
+        """
+        interval = self.intervals.get(command, 0.0)
+        if command == 'discover-vpns':
+            return [(None, vpns)] if self.due(command, interval) else []
+        full = [vpn for vpn in vpns if self.due(f"{command}\t{vpn.get('vpnname')}", interval)]
+        work = [(None, full)] if full else []
+        covered = {vpn.get('vpnname') for vpn in full}
+        for pattern, pattern_interval in self.patterns.get(command, []):
+            due = [vpn for vpn in vpns if vpn.get('vpnname') not in covered
+                   and self.due(f"{command}\t{vpn.get('vpnname')}\t{pattern}", pattern_interval)]
+            if due:
+                work.append((pattern, due))
+        return work
+
+    def retry(self, command: str, vpn_names: List[str]) -> None:
+        """Keep command due for these VPNs, their collection failed or was stopped by the cycle budget"""
+        # Bulk queue stats also produce the queue summaries
+        commands = (command, 'discover-queues-all') if command == 'queue-stats-all' else (command,)
+        retried = {(name, vpn_name) for name in commands for vpn_name in vpn_names}
+        with self._lock:
+            self._checked = {unit: window for unit, window in self._checked.items()
+                             if tuple(unit.split('\t')[:2]) not in retried}
+
+    def flush(self) -> None:
+        """Record the units that ran this cycle; units no longer evaluated are dropped"""
+        with self._lock:
+            if not self._checked:
+                return  # A single command was run, the schedule was not consulted
+            self._windows = dict(self._checked)
+            self._checked = {}
+            save_state(self.directory, 'schedule.json', self._windows)
+
+class SempRequestError(Exception):
+    """Raised when a SEMP request fails or returns an unusable response"""
+
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status  # HTTP status of the failed response, if there was one
+
+class CycleBudgetExceeded(Exception):
+    """Raised instead of a SEMP request once the running command has used its share of the cycle budget"""
+
+class TokenBucket:
+    """
+    Paces SEMP requests to a broker: up to burst requests at once, then rate
+    requests per second. Callers reserve a token and sleep until it is due, so
+    waiting threads are served in arrival order.
+    """
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self) -> None:
+        with self._lock:
+            self._refill()
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        if wait:
+            time.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        """Hold back all requests for seconds, e.g. from a Retry-After header"""
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.tokens, -seconds * self.rate)
+
+class ConcurrencyController:
+    """
+    Adaptive limit on concurrent SEMP requests (AIMD). Starting from the
+    configured maximum, each fast, successful response grows the limit by
+    1/limit (one request per round trip) and a slow or throttled (429/503)
+    response halves it, at most once per latency target so one slow burst
+    does not collapse it to 1.
+    """
+
+    def __init__(self, max_limit: int, latency_target: float):
+        self.max_limit = max_limit
+        self.latency_target = latency_target
+        self.limit = float(max_limit)
+        self.in_flight = 0
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+
+    def __enter__(self):
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+        return self
+
+    def __exit__(self, *exc_info):
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify()
+
+    def record(self, latency: float, throttled: bool = False) -> None:
+        """Adjust the limit from one response"""
+        with self._condition:
+            if throttled or latency > self.latency_target:
+                now = time.monotonic()
+                if now - self._last_decrease >= self.latency_target:
+                    self.limit = max(1.0, self.limit / 2)
+                    self._last_decrease = now
+                    logging.debug(f"Concurrency limit decreased to {self.limit:.1f} "
+                                  f"({'throttled' if throttled else f'{latency:.2f}s response'})")
+            elif self.limit < self.max_limit:
+                self.limit = min(float(self.max_limit), self.limit + 1 / self.limit)
+            self._condition.notify_all()
+
+class SolaceAPI:
+    def __init__(self, broker: Optional[Dict[str, Any]] = None, config: Optional[Dict[str, Any]] = None,
+                 metrics: Optional[SelfMetrics] = None, command: Optional[str] = None):
+        # Load environment config, the first configured broker unless one is given
+        if config is None:
+            config = load_config()
+        if broker is None:
+            broker = load_brokers(config)[0]
+        self.name = broker.get('name')  # Tagged on records as brokername when set
+        self.metrics = metrics
+        self.ha_group = broker.get('ha_group')
+        self.base_url = broker.get('base_url')
+        self.username = broker.get('username')
+        self.password = broker.get('password')
+        self.timeout = float(broker['timeout']) if broker.get('timeout') else None
+        self.page_size = int(config.get('SOLACE_PAGE_SIZE', DEFAULT_PAGE_SIZE))
+        self.queue_stats_mode = str(config.get('SOLACE_QUEUE_STATS_MODE', DEFAULT_QUEUE_STATS_MODE)).lower()
+        self.request_count = 0  # Number of SEMP GETs issued by this instance
+        self.filters = load_filters(config.get('SOLACE_FILTERS') or {})
+        self.select_fields = self._load_select_fields(config.get('SOLACE_SELECT_FIELDS') or {})
+        for resource_type, record_filter in self.filters.items():
+            # Local filtering needs the attributes the rules read
+            if resource_type in self.select_fields:
+                self.select_fields[resource_type].extend(attribute for attribute in record_filter.attributes
+                                                         if attribute not in self.select_fields[resource_type])
+        # Bulk queue stats can only require the stats fields the select allowlist asks for
+        if 'queue' in self.select_fields:
+            selected = {normalize_key(field) for field in self.select_fields['queue']}
+            self.queue_stats_fields = tuple(field for field in QUEUE_STATS_FIELDS if field in selected)
+        else:
+            self.queue_stats_fields = QUEUE_STATS_FIELDS
+        self.queue_stats_fallbacks = 0  # Per-queue requests issued by bulk queue stats
+        # This cycle's queue-stats-all totals, logged once even when collect-all runs it in several parts
+        self.queue_stats_totals = {'queues': 0, 'requests': 0, 'fallbacks': 0}
+        self.max_in_flight = max(1, int(broker.get('max_in_flight') or DEFAULT_MAX_IN_FLIGHT))
+        # Bounds concurrent requests across nested fan-outs (VPNs, then objects within a VPN),
+        # backing off below max_in_flight while the broker is slow or throttling
+        self.concurrency = ConcurrencyController(
+            self.max_in_flight, float(config.get('SOLACE_LATENCY_TARGET', DEFAULT_LATENCY_TARGET)))
+        rate_limit = float(broker.get('rate_limit') or 0)
+        self.rate_limiter = TokenBucket(rate_limit, float(config.get('SOLACE_RATE_BURST', rate_limit))) if rate_limit > 0 else None
+        self.cycle_budget = float(config.get('SOLACE_CYCLE_BUDGET', DEFAULT_CYCLE_BUDGET) or 0)
+        self.cycle_started = None  # Set by start_cycle, no budget applies before it
+        self.budget_share = 1.0  # Share of the cycle budget the running command may use
+        self.retries = max(0, int(config.get('SOLACE_RETRIES', DEFAULT_RETRIES)))
+        self.retry_backoff = float(config.get('SOLACE_RETRY_BACKOFF', DEFAULT_RETRY_BACKOFF))
+        self.retry_max_backoff = float(config.get('SOLACE_RETRY_MAX_BACKOFF', DEFAULT_RETRY_MAX_BACKOFF))
+        self.errors = []  # Per-VPN failures of the running cycle, reported in the error summary
+        self.skipped_vpns = set()  # VPNs skipped this cycle because their breaker is open
+        self._counter_lock = threading.Lock()
+        self.cache = DiscoveryCache(
+            broker['state_directory'],
+            config.get('SOLACE_CACHE_TTL') or {},
+            str(config.get('SOLACE_CACHE_STRATEGY', 'ttl')).lower(),
+            int(config.get('SOLACE_CACHE_MAX_ENTRIES', DEFAULT_CACHE_MAX_ENTRIES)),
+            int(config.get('SOLACE_CACHE_MAX_BYTES', DEFAULT_CACHE_MAX_BYTES)),
+        )
+        # command keys the state files every cycle rewrites, see state_name
+        self.schema = SchemaRegistry(self.cache.directory, command)
+        self.breaker = CircuitBreaker(
+            self.cache.directory,
+            int(config.get('SOLACE_BREAKER_THRESHOLD', DEFAULT_BREAKER_THRESHOLD)),
+            float(config.get('SOLACE_BREAKER_COOLDOWN', DEFAULT_BREAKER_COOLDOWN)),
+            command,
+        )
+        self.scheduler = None
+        if config.get('SOLACE_SCHEDULE') or config.get('SOLACE_SCHEDULE_PATTERNS'):
+            self.scheduler = Scheduler(self.cache.directory, config.get('SOLACE_SCHEDULE') or {},
+                                       config.get('SOLACE_SCHEDULE_PATTERNS') or [])
+        self.deltas = None
+        if config.get('SOLACE_DELTA_ENABLED', False):
+            counters = dict(DEFAULT_DELTA_COUNTERS)
+            counters.update({str(resource_type).lower(): [normalize_key(counter) for counter in names]
+                             for resource_type, names in (config.get('SOLACE_DELTA_COUNTERS') or {}).items()})
+            # Scheduled objects are not sampled every cycle, so keep samples for a few intervals
+            max_age = 3 * self.scheduler.longest_interval if self.scheduler else None
+            self.deltas = DeltaEngine(self.cache.directory, counters, max_age or None)
+        self.rollups = load_rollups(config.get('SOLACE_ROLLUPS', False))
+        self.churn = None
+        if config.get('SOLACE_CLIENT_CHURN', False):
+            self.churn = ClientChurn(
+                self.cache.directory,
+                int(config.get('SOLACE_CLIENT_TOP_K', DEFAULT_CLIENT_TOP_K)),
+                int(config.get('SOLACE_CLIENT_INDEX_MAX_ENTRIES', DEFAULT_CLIENT_INDEX_MAX_ENTRIES)),
+            )
+            if 'client' in self.select_fields:
+                self.select_fields['client'].extend(field for field in CLIENT_CHURN_FIELDS
+                                                    if field not in self.select_fields['client'])
+        self.changes = None
+        change_only = config.get('SOLACE_CHANGE_ONLY', False)
+        if change_only:
+            # true enables every stats resource type, a list enables only those
+            resource_types = list(STATS_COMMAND_RESOURCES.values()) if change_only is True else [str(r).lower() for r in change_only]
+            self.changes = ChangeFilter(
+                self.cache.directory,
+                resource_types,
+                int(config.get('SOLACE_CHANGE_HEARTBEAT_CYCLES', DEFAULT_CHANGE_HEARTBEAT_CYCLES)),
+                int(config.get('SOLACE_CHANGE_MAX_ENTRIES', DEFAULT_CHANGE_MAX_ENTRIES)),
+                [normalize_key(field) for field in config.get('SOLACE_CHANGE_IGNORE_FIELDS', DEFAULT_CHANGE_IGNORE_FIELDS)],
+                command,
+            )
+        # VPN attributes whose change invalidates a VPN's cached object lists ("count" strategy)
+        self.cache_count_fields = {str(resource_type).lower(): [normalize_key(field) for field in fields]
+                                   for resource_type, fields in (config.get('SOLACE_CACHE_COUNT_FIELDS') or {}).items()}
+        self._vpn_signatures = {}  # VPN name -> attributes from the latest VPN listing
+                
+        if not all([self.base_url, self.username, self.password]):
+            logging.error(f"Missing required configuration{f' for broker {self.name}' if self.name else ''}")
+            print_json_and_exit([], 0)
+            
+        import_http()
+        self.session = requests.Session()
+        self.session.auth = (self.username, self.password)
+        self.session.verify = False  # Skip SSL verification
+        self.session.headers.update({'Content-Type': 'application/json'})
+        # One connection per in-flight request, shared by all worker threads
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=self.max_in_flight)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        
+        if str(config.get('SOLACE_SCHEMA_SOURCE', 'learn')).lower() == 'spec':
+            self._bootstrap_schema()
+
+    def _bootstrap_schema(self) -> None:
+        """Seed field types from the broker's SEMP monitor spec, learning them instead on failure"""
+        if all(resource_type in self.schema.schemas for resource_type in SPEC_DEFINITIONS.values()):
+            return
+        try:
+            self.schema.bootstrap_from_spec(self._get(self._url('spec')).json())
+        except (requests.exceptions.RequestException, ValueError) as e:
+            logging.warning(f"Could not load the SEMP monitor spec, learning field types instead: {e}")
+
+    def is_active(self, endpoint: str = DEFAULT_HA_STATUS_ENDPOINT, field: str = DEFAULT_HA_STATUS_FIELD,
+                  active_values: List[str] = DEFAULT_HA_ACTIVE_VALUES) -> Optional[bool]:
+        """
+        Whether this node is the active one of its HA pair, from the redundancy
+        status attribute of a SEMP object. None when the status is unavailable.
+        """
+        try:
+            data = self._get(self._url(endpoint).rstrip('/')).json().get('data') or {}
+        except (requests.exceptions.RequestException, ValueError, CycleBudgetExceeded) as e:
+            logging.warning(f"Could not read the redundancy status of broker {self.name}: {e}")
+            return None
+        value = data.get(field) if isinstance(data, dict) else None
+        if value is None:
+            logging.warning(f"Broker {self.name} does not report {field}, cannot tell whether it is active")
+            return None
+        return normalize_key(value) in {normalize_key(active) for active in active_values}
+
+    def flush(self) -> None:
+        """Persist state kept across invocations"""
+        self.cache.flush()
+        self.schema.flush()
+        self.breaker.flush()
+        if self.scheduler:
+            self.scheduler.flush()
+        if self.deltas:
+            self.deltas.flush()
+        if self.changes:
+            self.changes.flush()
+        if self.churn:
+            self.churn.flush()
+
+    def _cache_signature(self, resource_type: str, vpn_name: str) -> Optional[list]:
+        """The VPN-level counters a cached object list of this resource type depends on"""
+        fields = self.cache_count_fields.get(resource_type)
+        vpn = self._vpn_signatures.get(vpn_name)
+        if not fields or vpn is None:
+            return None
+        return [vpn.get(field) for field in fields]
+
+    def fan_out(self, func: Callable[[Any], Any], items: List[Any]) -> List[Any]:
+        """
+        Call func for every item using up to max_in_flight worker threads.
+        Results are returned in the order of items, so output stays
+        deterministic regardless of which request finishes first.
+        """
+        return list(self.fan_out_iter(func, items))
+
+    def fan_out_iter(self, func: Callable[[Any], Any], items: List[Any]) -> Iterator[Any]:
+        """
+        Like fan_out, but yields each result as soon as it and all earlier ones
+        are done. At most max_in_flight calls are submitted ahead of the result
+        being yielded, so finished results do not pile up behind a slow one.
+        """
+        items = list(items)
+        if self.max_in_flight <= 1 or len(items) <= 1:
+            for item in items:
+                yield func(item)
+            return
+        with ThreadPoolExecutor(max_workers=min(self.max_in_flight, len(items))) as executor:
+            remaining = iter(items)
+            pending = deque(executor.submit(func, item) for item in itertools.islice(remaining, self.max_in_flight))
+            try:
+                while pending:
+                    result = pending.popleft().result()
+                    for item in itertools.islice(remaining, 1):
+                        pending.append(executor.submit(func, item))
+                    yield result
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    def fan_out_streams(self, func: Callable[[Any], Iterator[Any]], items: List[Any]) -> Iterator[Any]:
+        """
+        Like fan_out_iter for a func returning an iterator: the results of each
+        item's iterator are yielded in the order of items, as they arrive. Up to
+        max_in_flight items run at once, each buffering at most VPN_PAGE_BUFFER
+        results ahead of the consumer. An exception is raised by the consumer.
+        """
+        items = list(items)
+        if self.max_in_flight <= 1 or len(items) <= 1:
+            for item in items:
+                yield from func(item)
+            return
+        stopped = threading.Event()
+        
+        def put(buffer, entry):
+            # Give up once the consumer has stopped, nobody would take the entry
+            while not stopped.is_set():
+                try:
+                    buffer.put(entry, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+        
+        def produce(item, buffer):
+            try:
+                with contextlib.closing(iter(func(item))) as results:
+                    for result in results:
+                        if not put(buffer, (True, result)):
+                            return
+                put(buffer, (False, None))
+            except BaseException as e:
+                put(buffer, (False, e))
+        
+        with ThreadPoolExecutor(max_workers=min(self.max_in_flight, len(items))) as executor:
+            remaining = iter(items)
+            buffers = deque()
+            
+            def submit(count):
+                for item in itertools.islice(remaining, count):
+                    buffers.append(queue.Queue(maxsize=VPN_PAGE_BUFFER))
+                    executor.submit(produce, item, buffers[-1])
+            
+            try:
+                submit(self.max_in_flight)
+                while buffers:
+                    is_result, value = buffers[0].get()
+                    if is_result:
+                        yield value
+                        continue
+                    buffers.popleft()
+                    if value is not None:
+                        raise value
+                    submit(1)
+            finally:
+                stopped.set()
+
+    def fan_out_vpns(self, command: str, func: Callable[[str], Any], vpn_names: List[str]) -> Iterator[Any]:
+        """
+        Call func for every VPN, max_in_flight VPNs at a time, yielding the
+        results in VPN order. func returns one result, or a generator of pages
+        that are yielded as they arrive so a VPN's objects are never all held
+        at once (top-N filters rank whole VPNs, so then its pages are joined).
+        Failures are isolated per VPN: a VPN whose request fails (after
+        retries) is recorded for the error summary, the pages it returned before
+        are kept, and VPNs with an open circuit breaker are skipped.
+        """
+        allowed = []
+        for vpn_name in vpn_names:
+            if self.breaker.allow(vpn_name):
+                allowed.append(vpn_name)
+            else:
+                self.skipped_vpns.add(vpn_name)
+        record_filter = self.filters.get(STATS_COMMAND_RESOURCES.get(command))
+        join_pages = bool(record_filter and record_filter.top)
+        
+        def results(vpn_name):
+            try:
+                result = func(vpn_name)
+                if not isinstance(result, types.GeneratorType):
+                    yield result
+                elif join_pages:
+                    yield [item for page in result for item in page]
+                else:
+                    yield from result
+            except SempRequestError as e:
+                self.record_error(command, vpn_name, e)
+        
+        yield from self.fan_out_streams(results, allowed)
+
+    def record_error(self, command: str, vpn_name: str, error: Exception) -> None:
+        """Record a VPN that failed in this cycle"""
+        logging.error(f"{command} failed for VPN {vpn_name}: {error}")
+        self.breaker.failure(vpn_name)
+        if self.deltas:
+            self.deltas.keep(vpn_name)  # Its counters resume next cycle instead of starting over
+        if self.scheduler:
+            self.scheduler.retry(command, [vpn_name])
+        with self._counter_lock:
+            self.errors.append({'command': command, 'vpnname': vpn_name, 'error': str(error),
+                                'status': getattr(error, 'status', None)})
+
+    def error_summary(self) -> Optional[Dict[str, Any]]:
+        """One record describing this cycle's failed and skipped VPNs, None when there were none"""
+        if not self.errors and not self.skipped_vpns:
+            return None
+        details = '; '.join(f"{error['command']} {error['vpnname']}: {error['error']}" for error in self.errors)
+        return {
+            'event_type': 'SolaceCollectionErrors',
+            'errorcount': len(self.errors),
+            'failedvpns': ','.join(sorted({error['vpnname'] for error in self.errors})),
+            'failedcommands': ','.join(sorted({error['command'] for error in self.errors})),
+            'skippedvpns': ','.join(sorted(self.skipped_vpns)),
+            'errors': details[:ERROR_SUMMARY_MAX_LENGTH],
+        }
+
+    @staticmethod
+    def _load_select_fields(configured: Dict[str, Any]) -> Dict[str, List[str]]:
+        """
+        Build the per-resource select= allowlists from SOLACE_SELECT_FIELDS,
+        adding the identity fields of each resource type.
+        """
+        select_fields = {}
+        for resource_type, fields in configured.items():
+            resource_type = str(resource_type).lower()
+            if resource_type not in SELECT_IDENTITY_FIELDS:
+                logging.warning(f"Ignoring select fields for unknown resource type: {resource_type}")
+                continue
+            if isinstance(fields, str):
+                fields = fields.split(',')
+            merged = list(SELECT_IDENTITY_FIELDS[resource_type])
+            merged.extend(field.strip() for field in fields if field.strip() and field.strip() not in merged)
+            select_fields[resource_type] = merged
+        return select_fields
+
+    def _url(self, endpoint: str) -> str:
+        """Full SEMP monitor URL for an endpoint"""
+        base_url = self.base_url.rstrip('/SEMP/v2/monitor')
+        return f"{base_url}/SEMP/v2/monitor/{endpoint}"
+
+    def start_cycle(self) -> None:
+        """Start the cycle budget clock and clear the previous cycle's errors"""
+        self.cycle_started = time.monotonic()
+        self.budget_share = 1.0
+        self.errors = []
+        self.skipped_vpns = set()
+        self.queue_stats_totals = {'queues': 0, 'requests': 0, 'fallbacks': 0}
+        if self.rollups:
+            self.rollups.reset()
+        if self.churn:
+            self.churn.start_cycle()
+
+    def _check_budget(self) -> None:
+        if not self.cycle_budget or self.cycle_started is None:
+            return
+        allowed = self.cycle_budget * self.budget_share
+        elapsed = time.monotonic() - self.cycle_started
+        if elapsed > allowed:
+            raise CycleBudgetExceeded(f"cycle budget of {allowed:.1f}s used ({elapsed:.1f}s elapsed)")
+
+    def _get(self, url: str, params: Optional[Dict[str, Any]] = None,
+             timing: Optional[Dict[str, float]] = None) -> requests.Response:
+        """
+        Issue a SEMP GET, retrying connection errors, timeouts and transient
+        HTTP errors (RETRY_STATUSES) with jittered exponential backoff. A
+        Retry-After header sets the shortest wait. When given, timing gets the
+        latency of the answered attempt and adds up the seconds spent in
+        pacing and backoff.
+        """
+        attempt = 0
+        while True:
+            self._check_budget()
+            try:
+                response = self._send(url, params, timing)
+                if response.status_code not in RETRY_STATUSES or attempt >= self.retries:
+                    response.raise_for_status()
+                    return response
+                reason = f"HTTP {response.status_code}"
+                retry_after = response.headers.get('Retry-After', '')
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if attempt >= self.retries:
+                    raise
+                reason = str(e)
+                retry_after = ''
+            # Full jitter spreads the retries of concurrent requests apart
+            delay = random.uniform(0, min(self.retry_max_backoff, self.retry_backoff * 2 ** attempt))
+            if retry_after.isdigit():
+                delay = max(delay, float(retry_after))
+            attempt += 1
+            logging.warning(f"Retrying {url} in {delay:.2f}s (retry {attempt} of {self.retries}): {reason}")
+            if timing is not None:
+                timing['backoff'] += delay
+            time.sleep(delay)
+
+    def _send(self, url: str, params: Optional[Dict[str, Any]] = None,
+              timing: Optional[Dict[str, float]] = None) -> requests.Response:
+        """Issue one SEMP GET within the rate limit and concurrency limit"""
+        queued = time.perf_counter()
+        if self.rate_limiter:
+            self.rate_limiter.acquire()
+        with self.concurrency:
+            started = time.perf_counter()
+            try:
+                response = self.session.get(url, params=params, timeout=self.timeout)
+            except requests.exceptions.Timeout:
+                self.concurrency.record(time.perf_counter() - started, throttled=True)
+                raise
+        latency = time.perf_counter() - started
+        if timing is not None:
+            timing['pacing'] += started - queued
+            timing['latency'] = latency
+        throttled = response.status_code in THROTTLE_STATUSES
+        self.concurrency.record(latency, throttled)
+        retry_after = response.headers.get('Retry-After', '')
+        if throttled and self.rate_limiter and retry_after.isdigit():
+            self.rate_limiter.pause(float(retry_after))
+        with self._counter_lock:
+            self.request_count += 1
+        logging.debug(f"Response status: {response.status_code}")
+        return response
+
+    def make_request(self, endpoint: str, params: Optional[Dict[str, Any]] = None,
+                     paged: bool = True) -> List[Dict[str, Any]]:
+        """
+        Make a request to the Solace SEMP API and ensure flat list output.
+        Every page is collected into the returned list, use iter_pages to
+        process a large collection page by page instead.
+        """
+        return list(self.iter_request(endpoint, params, paged))
+
+    def iter_request(self, endpoint: str, params: Optional[Dict[str, Any]] = None,
+                     paged: bool = True) -> Iterator[Dict[str, Any]]:
+        """Iterate over the flattened items of a SEMP request, see iter_pages"""
+        for page in self.iter_pages(endpoint, params, paged):
+            yield from page
+
+    def iter_pages(self, endpoint: str, params: Optional[Dict[str, Any]] = None,
+                   paged: bool = True) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Iterate over the pages of a SEMP request, each a list of flattened items.
+
+        Collection endpoints are requested with count=<page size> and the
+        meta.paging.cursorUri of each response is followed until the broker
+        stops returning one. Each page is flattened as it arrives and its raw
+        JSON is dropped before it is yielded, so only callers that collect
+        every page (make_request) hold the whole collection.
+        Single-object endpoints should pass paged=False.
+        """
+        url = self._url(endpoint)
+        params = dict(params or {})
+        if paged:
+            params.setdefault('count', self.page_size)
+        resource_type = resource_for_endpoint(endpoint)
+        category = resource_type or endpoint.strip('/').split('/')[0] or 'broker'
+        vpn_name = vpn_for_endpoint(endpoint)
+        schema = self.schema.for_resource(resource_type)
+        if resource_type in self.select_fields:
+            params.setdefault('select', ','.join(self.select_fields[resource_type]))
+        page = 0
+        
+        try:
+            while url:
+                page += 1
+                logging.debug(f"Making API request to {url} (page {page})")
+                if params:
+                    logging.debug(f"Request parameters: \n{format_json_for_log(params)}")
+                    
+                timing = {'latency': 0.0, 'pacing': 0.0, 'backoff': 0.0}
+                response = self._get(url, params, timing)
+                data = response.json()
+                if self.metrics:
+                    self.metrics.observe_request(self.name, category, vpn_name, timing['latency'],
+                                                 len(response.content), timing['pacing'], timing['backoff'])
+                del response
+
+                # Extract and flatten the 'data' key if present
+                raw_data = data.get('data', [])
+                
+                # Process the raw data into flat dictionaries
+                if isinstance(raw_data, list):
+                    logging.debug(f"Processing {len(raw_data)} items from API response page {page}")
+                    items = raw_data
+                elif isinstance(raw_data, dict):
+                    items = [raw_data]
+                else:
+                    items = []
+                
+                flat_items = []
+                flatten_seconds = 0.0
+                for item in items:
+                    if isinstance(item, dict):
+                        started = time.perf_counter()
+                        flat_item = flatten_item(item, schema)
+                        flatten_seconds += time.perf_counter() - started
+                        # Debug log outside of the actual data flow
+                        if page == 1 and not flat_items and logging.getLogger().isEnabledFor(logging.DEBUG):
+                            logging.debug(f"Sample result item: \n{format_json_for_log(flat_item)}")
+                        flat_items.append(flat_item)
+                if self.metrics:
+                    self.metrics.observe_flatten(self.name, category, vpn_name, flatten_seconds, len(items))
+                
+                # The cursor URI already carries the full query string for the next page
+                paging = data.get('meta', {}).get('paging', {}) if paged else {}
+                url = paging.get('cursorUri')
+                params = None
+                # Drop the raw page before handing on the flattened one
+                del data, raw_data, items
+                yield flat_items
+
+            logging.debug(f"Finished {endpoint} after {page} page(s)")
+
+        except requests.exceptions.RequestException as e:
+            logging.error(f"API request failed: {e}")
+            status = e.response.status_code if getattr(e, 'response', None) is not None else None
+            raise SempRequestError(f"API request failed: {str(e)}", status) from e
+        except json.JSONDecodeError as e:
+            logging.error(f"Invalid JSON response: {e}")
+            raise SempRequestError(f"Invalid JSON response: {str(e)}") from e
+        except CycleBudgetExceeded:
+            raise
+        except Exception as e:
+            logging.error(f"Unexpected error: {e}")
+            raise SempRequestError(f"Unexpected error: {str(e)}") from e
+
+    def add_custom_attributes(self, items: List[Dict[str, Any]], event_type: str, resource_type: str = None) -> None:
+        """
+        Normalize all attribute keys in items - ensures consistent naming for dashboard queries.
+        All custom attributes should come from the Flex config.
+        """
+        for item in items:
+            # Records from make_request are already normalized, only rebuild the ones that are not
+            if all(normalize_key(key) == key for key in item):
+                continue
+            # Create a new dict with normalized keys
+            normalized_item = {}
+            for key, value in item.items():
+                normalized_key = normalize_key(key)  # Use our normalize_key function for consistency
+                normalized_item[normalized_key] = value
+            
+            # Replace the original dict with the normalized version
+            item.clear()
+            item.update(normalized_item)
+
+    def get_vpns(self, use_cache: bool = True) -> List[Dict[str, Any]]:
+        """
+        Get list of message VPNs. use_cache=False when the VPNs are emitted
+        as records themselves, their attributes must not be stale.
+        """
+        # The count strategy needs fresh VPN counters, so only cache the VPN list by TTL
+        data = self.cache.get('vpn', '') if use_cache and self.cache.strategy != 'count' else None
+        if data is None:
+            data = self.make_request('msgVpns')
+            self.cache.put('vpn', '', data)
+        logging.debug(f"Retrieved {len(data)} VPNs from API")
+        self._vpn_signatures = {vpn.get('vpnname'): vpn for vpn in data}
+        
+        # Log system VPNs being filtered out
+        if logging.getLogger().isEnabledFor(logging.DEBUG):
+            system_vpns = [vpn.get('vpnname') for vpn in data if vpn.get('vpnname', '').startswith('#')]
+            if system_vpns:
+                logging.debug(f"Filtering out system VPNs: {', '.join(system_vpns)}")
+        
+        # Filter only active VPNs and exclude system VPNs (starting with #)
+        active_vpns = [vpn for vpn in data if vpn.get('state') == 'up' and not vpn.get('vpnname', '').startswith('#')]
+        
+        # Add a simplified field for easy extraction
+        for vpn in active_vpns:
+            vpn['isActive'] = True
+            
+        logging.debug(f"Returning {len(active_vpns)} active, non-system VPNs")
+        return active_vpns
+
+    def get_queues(self, vpn_name: str, use_cache: bool = True, where: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Get list of queues for a VPN, from the discovery cache when it is still valid.
+        A SEMP where= filter bypasses the cache, the result is only part of the list.
+        """
+        if not vpn_name:
+            logging.warning("No VPN name provided")
+            return []
+        signature = self._cache_signature('queue', vpn_name)
+        if use_cache and not where:
+            cached = self.cache.get('queue', vpn_name, signature)
+            if cached is not None:
+                return cached
+        data = [queue for page in self.iter_vpn_pages(vpn_name, 'queues', where) for queue in page]
+        if not where:
+            self.cache.put('queue', vpn_name, data, signature)
+        return data
+
+    def get_topic_endpoints(self, vpn_name: str, use_cache: bool = True,
+                            where: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Get list of topic endpoints for a VPN, from the discovery cache unless filtered with where="""
+        if not vpn_name:
+            logging.warning("No VPN name provided")
+            return []
+        signature = self._cache_signature('topicendpoint', vpn_name)
+        if use_cache and not where:
+            cached = self.cache.get('topicendpoint', vpn_name, signature)
+            if cached is not None:
+                return cached
+        data = [endpoint for page in self.iter_vpn_pages(vpn_name, 'topicEndpoints', where) for endpoint in page]
+        if not where:
+            self.cache.put('topicendpoint', vpn_name, data, signature)
+        return data
+
+    def iter_vpn_pages(self, vpn_name: str, collection: str,
+                       where: Optional[str] = None) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Pages of one of a VPN's collections (queues, topicEndpoints, bridges,
+        clients), always fetched fresh. Queues and topic endpoints are tagged
+        with vpnname, the VPN name as SEMP reports it like on every other record.
+        """
+        if not vpn_name:
+            logging.warning("No VPN name provided")
+            return
+        # URL encode VPN name for special characters
+        quoted_vpn_name = quote(vpn_name, safe='')
+        for page in self.iter_pages(f'msgVpns/{quoted_vpn_name}/{collection}', {'where': where} if where else None):
+            if collection in ('queues', 'topicEndpoints'):
+                # Add vpnname to each object for easier reference; unquoted, so state keyed
+                # by VPN (deltas, breaker, rollups, churn) matches across resource types
+                for item in page:
+                    item['vpnname'] = vpn_name
+            yield page
+
+    def get_queue_stats(self, vpn_name: str, queue_name: str) -> Dict[str, Any]:
+        """Get stats for a specific queue"""
+        if not vpn_name or not queue_name:
+            logging.warning("Missing VPN name or queue name")
+            return {}
+        vpn_name = quote(vpn_name, safe='')
+        queue_name = quote(queue_name, safe='')
+        try:
+            data = self.make_request(f'msgVpns/{vpn_name}/queues/{queue_name}', paged=False)
+        except SempRequestError as e:
+            if e.status != 404:
+                raise
+            logging.info(f"Queue {queue_name} in VPN {vpn_name} was deleted since it was listed")
+            return {}
+        return data if isinstance(data, dict) else data[0] if data else {}
+
+    def iter_queue_stats_bulk(self, vpn_name: str, where: Optional[str] = None) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Get stats for all queues of a VPN from the paged queues collection,
+        one page at a time. Falls back to the single-queue endpoint only for
+        queues that are missing one of the required stats fields, and only to
+        fill those in.
+        """
+        
+        def fill_missing(entry):
+            queue, missing = entry
+            stats = self.get_queue_stats(vpn_name, queue['queuename'])
+            for field in missing:
+                if field in stats:
+                    queue[field] = stats[field]
+        
+        # The collection is the stats source here, so it must not come from the discovery cache
+        queue_count = fallbacks = 0
+        for queues in self.iter_vpn_pages(vpn_name, 'queues', where):
+            incomplete = []
+            for queue in queues:
+                missing = [field for field in self.queue_stats_fields if field not in queue]
+                if missing and queue.get('queuename'):
+                    logging.debug(f"Queue {queue.get('queuename')} missing {missing}, fetching single queue")
+                    incomplete.append((queue, missing))
+            self.fan_out(fill_missing, incomplete)
+            with self._counter_lock:
+                self.queue_stats_fallbacks += len(incomplete)
+            queue_count += len(queues)
+            fallbacks += len(incomplete)
+            yield queues
+        if fallbacks:
+            logging.info(f"VPN {vpn_name}: {fallbacks} of {queue_count} queues needed a per-queue fallback request")
+
+    def get_topic_endpoint_stats(self, vpn_name: str, endpoint_name: str) -> Dict[str, Any]:
+        """Get stats for a specific topic endpoint"""
+        if not vpn_name or not endpoint_name:
+            logging.warning("Missing VPN name or endpoint name")
+            return {}
+        vpn_name = quote(vpn_name, safe='')
+        endpoint_name = quote(endpoint_name, safe='')
+        try:
+            data = self.make_request(f'msgVpns/{vpn_name}/topicEndpoints/{endpoint_name}', paged=False)
+        except SempRequestError as e:
+            if e.status != 404:
+                raise
+            logging.info(f"Topic endpoint {endpoint_name} in VPN {vpn_name} was deleted since it was listed")
+            return {}
+        return data[0] if data else {}
+
+    def get_vpn_stats(self, vpn_name: str) -> Dict[str, Any]:
+        """Get stats for a specific VPN"""
+        if not vpn_name:
+            logging.warning("No VPN name provided")
+            return {}
+        vpn_name = quote(vpn_name, safe='')
+        data = self.make_request(f'msgVpns/{vpn_name}', paged=False)
+        return data[0] if data else {}
+
+    def get_bridge_stats(self, vpn_name: str, where: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Get bridge stats for a VPN, see iter_vpn_pages for them page by page"""
+        return [bridge for page in self.iter_vpn_pages(vpn_name, 'bridges', where) for bridge in page]
+
+    def get_client_stats(self, vpn_name: str, where: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Get client stats for a VPN, see iter_vpn_pages for them page by page"""
+        return [client for page in self.iter_vpn_pages(vpn_name, 'clients', where) for client in page]
+
+def name_where(command: str, pattern: Optional[str]) -> Optional[str]:
+    """SEMP where= clause selecting the objects of a command whose name matches a * / ? pattern"""
+    if not pattern:
+        return None
+    return f"{SELECT_IDENTITY_FIELDS[STATS_COMMAND_RESOURCES[command]][1]}=={pattern}"
+
+def collect_vpns(api: SolaceAPI, vpns: List[Dict[str, Any]], where: Optional[str] = None) -> Iterator[List[Dict[str, Any]]]:
+    """discover-vpns: the active, non-system VPNs"""
+    logging.debug("Discovering VPNs...")
+    # Get VPN list for output
+    vpn_names = [vpn.get('vpnname') for vpn in vpns if vpn.get('vpnname')]
+    logging.debug(f"Found {len(vpns)} VPNs, {len(vpn_names)} active non-system VPNs")
+    if logging.getLogger().isEnabledFor(logging.DEBUG) and vpns:
+        logging.debug(f"Active VPNs: \n{format_json_for_log(vpn_names)}")
+    yield vpns
+
+def collect_queues(api: SolaceAPI, vpns: List[Dict[str, Any]], where: Optional[str] = None) -> Iterator[List[Dict[str, Any]]]:
+    """discover-queues-all: all queues for all VPNs, one batch per SEMP page"""
+    vpn_names = [vpn.get('vpnname') for vpn in vpns if vpn.get('vpnname')]
+    # The summaries carry the queues' current counters, so they never come from the cache
+    get_queues = functools.partial(api.iter_vpn_pages, collection='queues', where=where)
+    for queues in api.fan_out_vpns('discover-queues-all', get_queues, vpn_names):
+        api.add_custom_attributes(queues, '', '')  # Just normalize the attribute names
+        yield queues
+
+def collect_topic_endpoints(api: SolaceAPI, vpns: List[Dict[str, Any]],
+                            where: Optional[str] = None) -> Iterator[List[Dict[str, Any]]]:
+    """discover-topic-endpoints-all: all topic endpoints for all VPNs, one batch per SEMP page"""
+    vpn_names = [vpn.get('vpnname') for vpn in vpns if vpn.get('vpnname')]
+    # Emitted as metrics, so always read fresh like bulk queue stats
+    get_topic_endpoints = functools.partial(api.iter_vpn_pages, collection='topicEndpoints', where=where)
+    for endpoints in api.fan_out_vpns('discover-topic-endpoints-all', get_topic_endpoints, vpn_names):
+        api.add_custom_attributes(endpoints, '', '')  # Just normalize the attribute names
+        yield endpoints
+
+def collect_queue_stats(api: SolaceAPI, vpns: List[Dict[str, Any]], where: Optional[str] = None) -> Iterator[List[Dict[str, Any]]]:
+    """queue-stats-all: stats for all queues in all VPNs, one batch per SEMP page (bulk) or VPN"""
+    vpn_names = [vpn.get('vpnname') for vpn in vpns if vpn.get('vpnname')]
+    requests_before = api.request_count
+    fallbacks_before = api.queue_stats_fallbacks
+    queue_count = 0
+    
+    def collect_vpn_queue_stats(vpn_name):
+        if api.queue_stats_mode == 'bulk':
+            # Build the stats from the paged queues collection
+            return api.iter_queue_stats_bulk(vpn_name, where)
+        
+        # Get all queues for this VPN, then stats for each queue
+        queue_names = [queue.get('queuename') for queue in api.get_queues(vpn_name, where=where) if queue.get('queuename')]
+        return [stats for stats in api.fan_out(lambda queue_name: api.get_queue_stats(vpn_name, queue_name), queue_names) if stats]
+    
+    try:
+        for queues in api.fan_out_vpns('queue-stats-all', collect_vpn_queue_stats, vpn_names):
+            api.add_custom_attributes(queues, '', '')  # Just normalize the attribute names
+            queue_count += len(queues)
+            yield queues
+    finally:
+        totals = api.queue_stats_totals
+        totals['queues'] += queue_count
+        totals['requests'] += api.request_count - requests_before
+        totals['fallbacks'] += api.queue_stats_fallbacks - fallbacks_before
+
+def log_queue_stats(api: SolaceAPI) -> None:
+    """Log the requests queue-stats-all issued this cycle and what bulk mode saved"""
+    totals = api.queue_stats_totals
+    if not totals['requests']:
+        return
+    # Per-object mode costs one request per queue on top of listing the collections,
+    # bulk mode only pays for the queues that needed a fallback request
+    if api.queue_stats_mode == 'bulk':
+        saved = totals['queues'] - totals['fallbacks']
+        logging.info(f"queue-stats-all (bulk): {totals['queues']} queues in {totals['requests']} requests, "
+                     f"{totals['fallbacks']} per-queue fallbacks, saved {saved} requests vs per-object mode")
+    else:
+        logging.info(f"queue-stats-all (per-object): {totals['queues']} queues in {totals['requests']} requests, "
+                     f"bulk mode would save up to {totals['queues']} requests")
+
+def collect_vpn_stats(api: SolaceAPI, vpns: List[Dict[str, Any]], where: Optional[str] = None) -> Iterator[List[Dict[str, Any]]]:
+    """vpn-stats-all: stats for all VPNs, one batch per VPN"""
+    vpn_names = [vpn.get('vpnname') for vpn in vpns if vpn.get('vpnname')]
+    for stats in api.fan_out_vpns('vpn-stats-all', api.get_vpn_stats, vpn_names):
+        if stats:
+            api.add_custom_attributes([stats], '', '')  # Just normalize the attribute names
+            yield [stats]
+
+def collect_bridge_stats(api: SolaceAPI, vpns: List[Dict[str, Any]], where: Optional[str] = None) -> Iterator[List[Dict[str, Any]]]:
+    """bridge-stats-all: bridge stats for all VPNs, one batch per SEMP page"""
+    vpn_names = [vpn.get('vpnname') for vpn in vpns if vpn.get('vpnname')]
+    get_bridge_stats = functools.partial(api.iter_vpn_pages, collection='bridges', where=where)
+    for bridges in api.fan_out_vpns('bridge-stats-all', get_bridge_stats, vpn_names):
+        api.add_custom_attributes(bridges, '', '')  # Just normalize the attribute names
+        yield bridges
+
+def collect_client_stats(api: SolaceAPI, vpns: List[Dict[str, Any]], where: Optional[str] = None) -> Iterator[List[Dict[str, Any]]]:
+    """client-stats-all: client stats for all VPNs, one batch per SEMP page"""
+    vpn_names = [vpn.get('vpnname') for vpn in vpns if vpn.get('vpnname')]
+    
+    def get_client_stats(vpn_name):
+        for clients in api.iter_vpn_pages(vpn_name, 'clients', where):
+            if api.churn:
+                api.churn.observe(vpn_name, clients, complete=False)
+            yield clients
+        if api.churn and where is None:
+            # Only a full client list shows which clients disconnected
+            api.churn.observe(vpn_name, [], complete=True)
+    
+    for clients in api.fan_out_vpns('client-stats-all', get_client_stats, vpn_names):
+        api.add_custom_attributes(clients, '', '')  # Just normalize the attribute names
+        yield clients
+
+# Each collector yields its command's records in batches (one per SEMP page of a VPN's
+# collection, or per VPN), so output is written as pages arrive instead of after the
+# whole broker has been collected.
+# Object collectors also take a SEMP where= filter limiting the objects fetched.
+COMMAND_COLLECTORS = {
+    'discover-vpns': collect_vpns,
+    'discover-queues-all': collect_queues,
+    'discover-topic-endpoints-all': collect_topic_endpoints,
+    'queue-stats-all': collect_queue_stats,
+    'vpn-stats-all': collect_vpn_stats,
+    'bridge-stats-all': collect_bridge_stats,
+    'client-stats-all': collect_client_stats,
+}
+
+# Event type and resource type of each command, matching the per-command APIs in
+# solace-flex-config.yml. collect-all tags its records with these itself.
+COMMAND_EVENT_TYPES = {
+    'discover-vpns': ('SolaceVPNSummary', None),
+    'discover-queues-all': ('SolaceQueueSummary', 'queue'),
+    'queue-stats-all': ('SolaceQueueStats', 'queue'),
+    'vpn-stats-all': ('SolaceVPNDetailedMetrics', None),
+    'discover-topic-endpoints-all': ('SolaceTopicEndpointMetrics', 'topicEndpoint'),
+    'bridge-stats-all': ('SolaceBridgeMetrics', 'bridge'),
+    'client-stats-all': ('SolaceClientMetrics', 'client'),
+}
+
+def postprocess(api: SolaceAPI, command: str, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Stateful stages applied to a batch of a command's records after collection"""
+    resource_type = STATS_COMMAND_RESOURCES.get(command)
+    if resource_type in api.filters:
+        records = api.filters[resource_type].apply(records)
+    if resource_type and api.deltas:
+        api.deltas.apply(resource_type, records)
+    if resource_type and api.rollups:
+        # Before change-only emission, the totals cover unchanged objects too
+        api.rollups.observe(resource_type, records)
+    if resource_type == 'client' and api.churn:
+        # Replaced by churn events and the top clients at the end of the cycle
+        api.churn.rank(records)
+        return []
+    if resource_type and api.changes:
+        records = api.changes.apply(resource_type, records)
+    return records
+
+def iter_batches(api: SolaceAPI, command: str, vpns: List[Dict[str, Any]],
+                 where: Optional[str] = None, pushdown: bool = True,
+                 shared: bool = False) -> Iterator[List[Dict[str, Any]]]:
+    """
+    A command's record batches, stopped once the command has used the cycle
+    budget. shared=True (collect-all) limits it to its COMMAND_BUDGET_SHARES
+    share, a command run on its own may use the whole budget. pushdown=False
+    fetches every object even when the command's filter rules could be sent as
+    where=, for callers that also need the unfiltered objects; postprocess
+    still filters the command's records.
+    """
+    if not vpns:
+        return
+    api.budget_share = COMMAND_BUDGET_SHARES.get(command, 1.0) if shared else 1.0
+    record_filter = api.filters.get(STATS_COMMAND_RESOURCES.get(command))
+    if record_filter and pushdown:
+        # Let the broker drop objects that do not match the filter rules
+        where = join_where(where, record_filter.pushdown)
+    try:
+        yield from COMMAND_COLLECTORS[command](api, vpns, where)
+    except CycleBudgetExceeded as e:
+        logging.warning(f"{command}{f' on broker {api.name}' if api.name else ''} stopped early: {e}")
+        if api.scheduler:
+            api.scheduler.retry(command, [vpn.get('vpnname') for vpn in vpns])
+    finally:
+        # Requests outside a command (e.g. the VPN list) may use the whole budget
+        api.budget_share = 1.0
+
+def iter_command(api: SolaceAPI, command: str, vpns: List[Dict[str, Any]],
+                 where: Optional[str] = None, shared: bool = False) -> Iterator[Dict[str, Any]]:
+    """Records of one command, post-processed batch by batch"""
+    for batch in iter_batches(api, command, vpns, where, shared=shared):
+        yield from postprocess(api, command, batch)
+    if command == 'queue-stats-all' and not shared:
+        log_queue_stats(api)
+
+def scheduled_work(api: SolaceAPI, command: str, vpns: List[Dict[str, Any]]) -> List[Tuple[Optional[str], List[Dict[str, Any]]]]:
+    """The (where= filter, VPNs) pairs of command due this cycle, all VPNs unfiltered without a schedule"""
+    if not api.scheduler:
+        return [(None, vpns)]
+    return [(name_where(command, pattern), due) for pattern, due in api.scheduler.work(command, vpns)]
+
+def iter_collect_all(api: SolaceAPI) -> Iterator[Dict[str, Any]]:
+    """
+    collect-all: run every command in one pass over a single session.
+    VPNs are discovered once and shared by all collectors, and each record is
+    tagged with the event_type (and resourcetype) its own command would get
+    from the Flex config. Records are yielded as each SEMP page arrives.
+    """
+    requests_before = api.request_count
+    vpns = api.get_vpns(use_cache=False)  # Also emitted as the VPN summaries
+    emitted = 0
+    
+    def tagged(command, records):
+        event_type, resource_type = COMMAND_EVENT_TYPES[command]
+        for item in records:
+            item['event_type'] = event_type
+            if resource_type:
+                item['resourcetype'] = resource_type
+            yield item
+    
+    for command in COMMAND_EVENT_TYPES:
+        if command == 'queue-stats-all' and api.queue_stats_mode == 'bulk':
+            continue  # Emitted together with the queue summaries, they come from the same collection
+        if command == 'discover-queues-all' and api.queue_stats_mode == 'bulk':
+            summary_vpns = {vpn.get('vpnname') for _, due in scheduled_work(api, command, vpns) for vpn in due}
+            stats_work = scheduled_work(api, 'queue-stats-all', vpns)
+            stats_vpns = {vpn.get('vpnname') for where, due in stats_work if where is None for vpn in due}
+            # One fetch per VPN serves both the summaries and the stats that are due
+            for emit_summaries, emit_stats in ((True, True), (True, False), (False, True)):
+                fetch = [vpn for vpn in vpns if (vpn.get('vpnname') in summary_vpns) == emit_summaries
+                         and (vpn.get('vpnname') in stats_vpns) == emit_stats]
+                # A queue stats filter must not shrink the queue inventory, so the summaries
+                # are fetched unfiltered and the filter is only applied to the stats copy
+                for batch in iter_batches(api, 'queue-stats-all', fetch, pushdown=not emit_summaries, shared=True):
+                    if emit_summaries:
+                        summaries = [dict(queue) for queue in batch]
+                        for item in tagged('discover-queues-all', postprocess(api, 'discover-queues-all', summaries)):
+                            emitted += 1
+                            yield item
+                    if emit_stats:
+                        for item in tagged('queue-stats-all', postprocess(api, 'queue-stats-all', batch)):
+                            emitted += 1
+                            yield item
+            for where, due in stats_work:
+                if where is not None:
+                    for item in tagged('queue-stats-all', iter_command(api, 'queue-stats-all', due, where, shared=True)):
+                        emitted += 1
+                        yield item
+            continue
+        for where, due in scheduled_work(api, command, vpns):
+            for item in tagged(command, iter_command(api, command, due, where, shared=True)):
+                emitted += 1
+                yield item
+    log_queue_stats(api)
+    logging.info(f"collect-all: {emitted} records from {len(vpns)} VPNs in {api.request_count - requests_before} requests, "
+                 f"concurrency limit {api.concurrency.limit:.1f} of {api.max_in_flight}")
+
+class BrokerPool:
+    """
+    The brokers collected by one integration instance. Each broker has its own
+    SolaceAPI (session, connection pool, timeout and state) and brokers are
+    collected in parallel, their records interleaved as they arrive.
+    """
+
+    def __init__(self, config: Dict[str, Any], metrics: Optional[SelfMetrics] = None, command: Optional[str] = None):
+        self.metrics = metrics
+        self.apis = [SolaceAPI(broker, config, metrics, command) for broker in load_brokers(config)]
+        self.active_only = bool(config.get('SOLACE_HA_ACTIVE_ONLY', False))
+        self.ha_status = (
+            config.get('SOLACE_HA_STATUS_ENDPOINT', DEFAULT_HA_STATUS_ENDPOINT),
+            config.get('SOLACE_HA_STATUS_FIELD', DEFAULT_HA_STATUS_FIELD),
+            [str(value) for value in config.get('SOLACE_HA_ACTIVE_VALUES', DEFAULT_HA_ACTIVE_VALUES)],
+        )
+        self.failed = set()  # Brokers whose collection failed in the current cycle
+
+    def active(self) -> List[SolaceAPI]:
+        """
+        The brokers to collect this cycle. With SOLACE_HA_ACTIVE_ONLY only the
+        active node of each ha_group is kept; when no node of a group reports
+        active (e.g. during a failover) every node of it is collected.
+        """
+        if not self.active_only:
+            return self.apis
+        grouped = [api for api in self.apis if api.ha_group]
+        statuses = dict(zip(grouped, BrokerPool._fan_out(lambda api: api.is_active(*self.ha_status), grouped)))
+        selected = []
+        for api in self.apis:
+            if not api.ha_group:
+                selected.append(api)
+                continue
+            group = [node for node in grouped if node.ha_group == api.ha_group]
+            if statuses[api] or not any(statuses[node] for node in group):
+                selected.append(api)
+            else:
+                logging.debug(f"Skipping standby broker {api.name} of HA group {api.ha_group}")
+        return selected
+
+    @staticmethod
+    def _fan_out(func: Callable[[Any], Any], items: List[Any]) -> List[Any]:
+        """Call func for every item, one thread per item"""
+        if len(items) <= 1:
+            return [func(item) for item in items]
+        with ThreadPoolExecutor(max_workers=len(items)) as executor:
+            return list(executor.map(func, items))
+
+    @staticmethod
+    def _tagged(api: SolaceAPI, records: Iterator[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """
+        Records tagged with brokername, followed by the broker's client churn
+        events, rollups and its error summary if it had errors
+        """
+        for record in records:
+            if api.name:
+                record['brokername'] = api.name
+            yield record
+        for record in api.churn.records() if api.churn else []:
+            if api.name:
+                record['brokername'] = api.name
+            yield record
+        for rollup in api.rollups.records() if api.rollups else []:
+            if api.name:
+                rollup['brokername'] = api.name
+            yield rollup
+        summary = api.error_summary()
+        if summary:
+            if api.name:
+                summary['brokername'] = api.name
+            yield summary
+
+    def collect(self, collect: Callable[[SolaceAPI], Iterator[Dict[str, Any]]]) -> Iterator[Dict[str, Any]]:
+        """
+        Records of collect(api) for every active broker, tagged with brokername.
+        With several brokers a failed broker is reported as an error record and
+        the others are still collected; a single broker raises as before.
+        """
+        self.failed = set()
+        if self.metrics:
+            self.metrics.reset()
+        # Before the HA status requests, which already count against this cycle's budget
+        for api in self.apis:
+            api.start_cycle()
+        apis = self.active()
+        if len(apis) == 1:
+            yield from self._tagged(apis[0], collect(apis[0]))
+            return
+        
+        results = queue.Queue(maxsize=BROKER_QUEUE_SIZE)
+        done = object()
+        
+        def run(api):
+            try:
+                for record in self._tagged(api, collect(api)):
+                    results.put(record)
+            except SempRequestError as e:
+                logging.error(f"Collection from broker {api.name} failed: {e}")
+                self.failed.add(api)
+                results.put({"error": str(e), "brokername": api.name})
+            except Exception as e:
+                logging.error(f"Unexpected error collecting broker {api.name}: {str(e)}", exc_info=True)
+                self.failed.add(api)
+                results.put({"error": f"Unexpected error: {str(e)}", "brokername": api.name})
+            finally:
+                results.put(done)
+        
+        # Daemon threads, so an abandoned collection does not keep the process alive
+        for api in apis:
+            threading.Thread(target=run, args=(api,), name=f"broker-{api.name}", daemon=True).start()
+        remaining = len(apis)
+        while remaining:
+            record = results.get()
+            if record is done:
+                remaining -= 1
+            else:
+                yield record
+
+    def flush(self) -> None:
+        """Persist the state of every broker collected successfully this cycle"""
+        for api in self.apis:
+            if api not in self.failed:
+                api.flush()
+
+def json_encoder(name: str = 'auto') -> Callable[[Any], str]:
+    """
+    The JSON encoder used for output: orjson when it is installed (or requested),
+    the standard library otherwise. Values orjson rejects fall back to json.dumps.
+    """
+    if name in ('auto', 'orjson'):
+        try:
+            import orjson
+        except ImportError:
+            if name == 'orjson':
+                logging.warning("orjson is not installed, using the standard json encoder")
+        else:
+            def dumps(obj):
+                try:
+                    return orjson.dumps(obj).decode()
+                except TypeError:
+                    return json.dumps(obj)
+            return dumps
+    return json.dumps
+
+class JsonArrayWriter:
+    """
+    Writes records to a stream as the elements of one JSON array, so output
+    never has to be held in memory as a whole. An empty result is written as
+    {} to match print_json_and_exit.
+    """
+
+    def __init__(self, stream, dumps: Callable[[Any], str] = json.dumps, metrics: Optional[SelfMetrics] = None):
+        self.stream = stream
+        self.dumps = dumps
+        self.metrics = metrics  # Records serialization time when set
+        self.count = 0
+
+    def write(self, record: Dict[str, Any]) -> None:
+        # Encoded before anything is written, so a record that cannot be encoded leaves no separator behind
+        if self.metrics:
+            started = time.perf_counter()
+            encoded = self.dumps(record)
+            self.metrics.observe_serialize(record, time.perf_counter() - started)
+        else:
+            encoded = self.dumps(record)
+        self.stream.write(', ' if self.count else '[')
+        self.stream.write(encoded)
+        self.count += 1
+
+    def write_self_metrics(self) -> None:
+        """Append the cycle's self-metrics records, which are not timed themselves"""
+        if not self.metrics:
+            return
+        records, self.metrics = self.metrics.records(), None
+        for record in records:
+            self.write(record)
+
+    def close(self) -> None:
+        self.stream.write(']\n' if self.count else '{}\n')
+        self.stream.flush()
+
+# Endpoint sampled by select-report for each resource type
+SELECT_REPORT_ENDPOINTS = {
+    'vpn': 'msgVpns',
+    'queue': 'msgVpns/{vpn}/queues',
+    'topicendpoint': 'msgVpns/{vpn}/topicEndpoints',
+    'bridge': 'msgVpns/{vpn}/bridges',
+    'client': 'msgVpns/{vpn}/clients',
+}
+
+def dashboard_attributes(dashboard_path: str) -> Dict[str, set]:
+    """
+    Collect the lowercase identifiers used by each resource type's NRQL queries
+    in a dashboard export, keyed by the resource type of the queried event type.
+    """
+    # Commands without a resourcetype are the VPN-level ones
+    event_resources = {event_type: (resource_type or 'vpn').lower()
+                       for event_type, resource_type in COMMAND_EVENT_TYPES.values()}
+    with open(dashboard_path, 'r') as f:
+        dashboard = json.load(f)
+    
+    queries = []
+    def find_queries(node):
+        if isinstance(node, dict):
+            for key, value in node.items():
+                if key == 'query' and isinstance(value, str):
+                    queries.append(value)
+                else:
+                    find_queries(value)
+        elif isinstance(node, list):
+            for value in node:
+                find_queries(value)
+    find_queries(dashboard)
+    
+    attributes = {}
+    for query in queries:
+        for event_type in re.findall(r'\bFROM\s+(\w+)', query, re.IGNORECASE):
+            resource_type = event_resources.get(event_type)
+            if resource_type:
+                tokens = {token.lower() for token in re.findall(r'[A-Za-z_][A-Za-z0-9_]*', query)}
+                attributes.setdefault(resource_type, set()).update(tokens)
+    return attributes
+
+def select_report(api: SolaceAPI, dashboard_path: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    select-report: fetch one page of every resource type with and without its
+    select= allowlist and report the bytes and flattened keys saved. With a
+    dashboard export, also suggest the SEMP attributes its queries use.
+    """
+    vpn_names = [vpn.get('vpnname') for vpn in api.get_vpns() if vpn.get('vpnname')]
+    used_attributes = dashboard_attributes(dashboard_path) if dashboard_path else {}
+    report = []
+    for resource_type, template in SELECT_REPORT_ENDPOINTS.items():
+        if '{vpn}' in template and not vpn_names:
+            continue
+        endpoint = template.format(vpn=quote(vpn_names[0], safe='') if vpn_names else '')
+        url = api._url(endpoint)
+        try:
+            full = api._get(url, {'count': api.page_size})
+            full_items = full.json().get('data', [])
+            entry = {
+                'resourcetype': resource_type,
+                'endpoint': endpoint,
+                'objects': len(full_items),
+                'fullbytes': len(full.content),
+                'fullkeys': sum(len(flatten_item(item, api.schema.for_resource(resource_type))) for item in full_items),
+            }
+            if resource_type in api.select_fields:
+                selected = api._get(url, {'count': api.page_size, 'select': ','.join(api.select_fields[resource_type])})
+                selected_items = selected.json().get('data', [])
+                entry['selectedbytes'] = len(selected.content)
+                entry['selectedkeys'] = sum(len(flatten_item(item, api.schema.for_resource(resource_type))) for item in selected_items)
+                entry['savedbytes'] = entry['fullbytes'] - entry['selectedbytes']
+                entry['savedkeys'] = entry['fullkeys'] - entry['selectedkeys']
+            if resource_type in used_attributes and full_items:
+                # Map the dashboard's normalized names back to SEMP attribute names
+                raw_keys = sorted({key for item in full_items for key in item})
+                entry['suggestedselect'] = ','.join(key for key in raw_keys if normalize_key(key) in used_attributes[resource_type])
+        except requests.exceptions.RequestException as e:
+            logging.error(f"select-report failed for {resource_type}: {e}")
+            entry = {'resourcetype': resource_type, 'endpoint': endpoint, 'error': str(e)}
+        report.append(entry)
+    return report
+
+class SnapshotServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Holds the latest collect-all result in memory and hands it to every
+    client that connects to the Unix domain socket. The payload is a header
+    line with the collection timestamp followed by the JSON output, encoded
+    once per cycle so serving a client is a single sendall().
+    """
+    daemon_threads = True
+
+    class Handler(socketserver.BaseRequestHandler):
+        def handle(self):
+            self.request.sendall(self.server.payload)
+
+    def __init__(self, socket_path: str):
+        # Remove a socket left behind by a previous daemon
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        super().__init__(socket_path, self.Handler)
+        self.payload = b''
+
+    def update(self, records: Iterator[Dict[str, Any]], dumps: Callable[[Any], str] = json.dumps,
+               metrics: Optional[SelfMetrics] = None) -> None:
+        """Replace the served snapshot with a freshly collected one"""
+        body = io.StringIO()
+        writer = JsonArrayWriter(body, dumps, metrics)
+        for record in records:
+            writer.write(record)
+        writer.write_self_metrics()
+        writer.close()
+        header = json.dumps({"timestamp": time.time(), "count": writer.count})
+        self.payload = f"{header}\n{body.getvalue().rstrip()}".encode()
+
+def run_daemon(pool: BrokerPool, socket_path: str, interval: float, dumps: Callable[[Any], str] = json.dumps) -> None:
+    """
+    Keep the SEMP session warm and re-run collect-all every interval seconds,
+    serving the latest result over socket_path. A failed cycle keeps the
+    previous snapshot, which the snapshot command reports once it goes stale.
+    """
+    server = SnapshotServer(socket_path)
+    # Let service managers stop the daemon cleanly so the socket file is removed
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    threading.Thread(target=server.serve_forever, name='snapshot-server', daemon=True).start()
+    logging.info(f"Collector daemon serving snapshots on {socket_path} every {interval}s")
+    
+    try:
+        while True:
+            started = time.monotonic()
+            try:
+                server.update(pool.collect(iter_collect_all), dumps, pool.metrics)
+                pool.flush()
+            except SempRequestError as e:
+                logging.error(f"Collection cycle failed, keeping previous snapshot: {e}")
+            except Exception as e:
+                # Any other failure must not end the daemon either, the next cycle may succeed
+                logging.error(f"Unexpected error in collection cycle, keeping previous snapshot: {e}", exc_info=True)
+            time.sleep(max(0.0, interval - (time.monotonic() - started)))
+    finally:
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+def print_snapshot(socket_path: str, max_age: float) -> None:
+    """Print the daemon's latest snapshot for Flex, or an error if it is missing or stale"""
+    chunks = []
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.settimeout(5)
+            client.connect(socket_path)
+            while True:
+                chunk = client.recv(1 << 16)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+    except OSError as e:
+        logging.error(f"Collector daemon not reachable on {socket_path}: {e}")
+        print_json_and_exit({"error": f"Collector daemon not reachable: {str(e)}"}, 0)
+    
+    header, _, body = b''.join(chunks).partition(b'\n')
+    if not header:
+        print_json_and_exit({"error": "Collector daemon has no snapshot yet"}, 0)
+    age = time.time() - json.loads(header)['timestamp']
+    if age > max_age:
+        logging.warning(f"Snapshot is {age:.1f}s old, older than {max_age}s")
+        print_json_and_exit({"error": f"Snapshot is stale ({age:.1f}s old, max {max_age}s)",
+                             "snapshotageseconds": round(age, 1)}, 0)
+    # The body is already serialized JSON, pass it through untouched
+    sys.stdout.write(body.decode())
+    sys.stdout.write('\n')
+    sys.exit(0)
+
+def main():
+    """
+    Main entry point for the Solace API client.
+    Parses command line arguments and executes the appropriate command.
+    """
+    parser = argparse.ArgumentParser(
+        description='Solace SEMP API Client for New Relic Integration',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Discover all VPNs
+  python3 entrypoint.py discover-vpns
+  
+  # Get all queue stats across all VPNs
+  python3 entrypoint.py queue-stats-all
+  
+  # Get stats for all bridges across all VPNs
+  python3 entrypoint.py bridge-stats-all
+  
+  # Collect everything in one invocation
+  python3 entrypoint.py collect-all
+  
+  # Keep collecting in the background and read the latest result from Flex
+  python3 entrypoint.py daemon
+  python3 entrypoint.py snapshot
+"""
+    )
+    
+    commands_help = {
+        'discover-vpns': 'Discover all message VPNs',
+        'discover-queues-all': 'Discover all queues across all VPNs',
+        'discover-topic-endpoints-all': 'Discover all topic endpoints across all VPNs',
+        'queue-stats-all': 'Get statistics for all queues across all VPNs',
+        'vpn-stats-all': 'Get statistics for all VPNs',
+        'bridge-stats-all': 'Get bridge statistics for all VPNs',
+        'client-stats-all': 'Get client statistics for all VPNs',
+        'collect-all': 'Collect all of the above in one pass, tagging each record with its event_type',
+        'daemon': 'Run collect-all continuously and serve the latest result over a Unix socket',
+        'snapshot': 'Print the latest result of a running daemon',
+        'select-report': 'Report bytes and keys saved by SOLACE_SELECT_FIELDS for each resource type'
+    }
+    
+    parser.add_argument('command', choices=list(commands_help.keys()), 
+                       help='Command to execute', metavar='COMMAND',
+                       type=str.lower)  # Case-insensitive command matching
+    parser.add_argument('--debug', action='store_true', help='Enable debug logging')
+
+    args = parser.parse_args()
+    # Parsed once, after the arguments are known to be valid
+    try:
+        config = read_config()
+        config_error = None
+    except Exception as e:
+        config, config_error = {}, e
+    initialize_logging(config)
+    if config_error:
+        logging.error(f"Failed to load config: {config_error}")
+    
+    try:
+        # Set debug logging if requested via command line (overrides config)
+        if args.debug:
+            logging.getLogger().setLevel(logging.DEBUG)
+            logging.debug("Debug logging enabled via command line")
+            logging.debug(f"Python version: {sys.version}")
+            logging.debug(f"Running from directory: {os.getcwd()}")
+            logging.debug(f"Arguments: {vars(args)}")
+        
+        socket_path = config.get('SOLACE_DAEMON_SOCKET', DEFAULT_DAEMON_SOCKET)
+        interval = float(config.get('SOLACE_DAEMON_INTERVAL', DEFAULT_DAEMON_INTERVAL))
+        if args.command == 'snapshot':
+            # The thin client never talks to SEMP, so it does not need a session
+            print_snapshot(socket_path, float(config.get('SOLACE_SNAPSHOT_MAX_AGE', interval * 3)))
+        
+        # Optional cProfile/tracemalloc dump of the whole run for offline analysis
+        profile_mode = str(config.get('SOLACE_PROFILE', '') or '').lower()
+        with profiling(profile_mode, config.get('SOLACE_PROFILE_DIRECTORY') or state_directory(config), args.command):
+            # Per-command Flex runs would each emit a partial series relabelled by custom_attributes
+            self_metrics = config.get('SOLACE_SELF_METRICS', True) and args.command in CYCLE_COMMANDS
+            pool = BrokerPool(config, SelfMetrics() if self_metrics else None, args.command)
+            
+            # No argument validation needed - all commands operate on all VPNs
+            
+            # Log the command being executed
+            logging.debug(f"Executing command: {args.command} with args: {vars(args)}")
+            logging.info(f"Processing command: {args.command}")
+            
+            dumps = json_encoder(str(config.get('SOLACE_JSON_ENCODER', 'auto')).lower())
+            
+            # Execute the command
+            if args.command == 'daemon':
+                run_daemon(pool, socket_path, interval, dumps)
+            elif args.command == 'select-report':
+                print_json_and_exit(select_report(pool.apis[0], config.get('SOLACE_DASHBOARD_PATH')))
+            elif args.command == 'collect-all':
+                records = pool.collect(iter_collect_all)
+            elif args.command in COMMAND_COLLECTORS:
+                # discover-vpns emits the VPN list itself, so it must not come from the cache
+                use_cache = args.command != 'discover-vpns'
+                records = pool.collect(lambda api: iter_command(api, args.command, api.get_vpns(use_cache)))
+            else:
+                print_json_and_exit({"error": f"Unknown command: {args.command}"}, 0)
+            
+            # Stream the records to stdout as SEMP pages arrive
+            writer = JsonArrayWriter(sys.stdout, dumps, pool.metrics)
+            try:
+                for record in records:
+                    if not writer.count and logging.getLogger().isEnabledFor(logging.DEBUG):
+                        # Log a sample item from the result for debugging
+                        logging.debug(f"Sample result item: \n{format_json_for_log(record)}")
+                    writer.write(record)
+            except Exception as e:
+                if not writer.count:
+                    raise
+                # Part of the array is already written, end it with the error instead
+                if isinstance(e, SempRequestError):
+                    writer.write({"error": str(e)})
+                else:
+                    logging.error(f"Unexpected error in command {args.command}: {str(e)}", exc_info=True)
+                    writer.write({"error": f"Unexpected error: {str(e)}"})
+                writer.close()
+                sys.exit(0)
+            writer.write_self_metrics()
+            writer.close()
+            
+            logging.debug(f"Command {args.command} completed. Returned {writer.count} results.")
+            pool.flush()
+            sys.exit(0)
+        
+    except SempRequestError as e:
+        print_json_and_exit({"error": str(e)}, 0)
+    except Exception as e:
+        logging.error(f"Unexpected error in command {getattr(args, 'command', 'unknown')}: {str(e)}", exc_info=True)
+        print_json_and_exit({"error": f"Unexpected error: {str(e)}"}, 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""Shared fixtures: the integration module and a fake SEMP broker to run it against"""
+import json
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+import nri_solace  # noqa: E402
+import fake_semp  # noqa: E402
+
+
+@pytest.fixture
+def semp():
+    """A small fake broker: 2 VPNs with 25 queues each"""
+    return fake_semp.FakeSemp(vpns=2, queues=25, topic_endpoints=3, bridges=1, clients=5, seed=1)
+
+
+@pytest.fixture
+def server(semp):
+    server = fake_semp.start(semp)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def make_api(server, tmp_path):
+    """Build a SolaceAPI for the fake broker, with config overrides"""
+    def make(**overrides):
+        config = {
+            'SOLACE_BASE_URL': f"http://127.0.0.1:{server.server_port}",
+            'SOLACE_USERNAME': 'admin',
+            'SOLACE_PASSWORD': 'admin',
+            'SOLACE_STATE_DIRECTORY': str(tmp_path / 'state'),
+            'SOLACE_RETRIES': 0,
+            **overrides,
+        }
+        return nri_solace.SolaceAPI(config=config)
+    return make
+
+
+@pytest.fixture
+def run_main(server, tmp_path, monkeypatch, capsys):
+    """Run entrypoint main() for a command against the fake broker and return its JSON output"""
+    def run(command, **overrides):
+        config = {
+            'SOLACE_BASE_URL': f"http://127.0.0.1:{server.server_port}",
+            'SOLACE_USERNAME': 'admin',
+            'SOLACE_PASSWORD': 'admin',
+            'SOLACE_STATE_DIRECTORY': str(tmp_path / 'state'),
+            'SOLACE_RETRIES': 0,
+            **overrides,
+        }
+        monkeypatch.setattr(nri_solace, 'read_config', lambda *args: config)
+        monkeypatch.setattr(nri_solace, 'initialize_logging', lambda config: None)
+        monkeypatch.setattr(sys, 'argv', ['entrypoint.py', command])
+        with pytest.raises(SystemExit):
+            nri_solace.main()
+        return json.loads(capsys.readouterr().out)
+    return run
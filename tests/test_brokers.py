@@ -0,0 +1,45 @@
+"""BrokerPool: several brokers and HA pairs"""
+import time
+
+import fake_semp
+import nri_solace
+
+
+def test_ha_status_is_read_within_the_new_cycle(server, semp, tmp_path):
+    standby = fake_semp.start(semp, redundancy='local-standby')
+    try:
+        config = {
+            'SOLACE_USERNAME': 'admin',
+            'SOLACE_PASSWORD': 'admin',
+            'SOLACE_STATE_DIRECTORY': str(tmp_path),
+            'SOLACE_HA_ACTIVE_ONLY': True,
+            'SOLACE_CYCLE_BUDGET': 5,
+            'SOLACE_BROKERS': [
+                {'name': 'primary', 'base_url': f"http://127.0.0.1:{server.server_port}", 'ha_group': 'pair'},
+                {'name': 'backup', 'base_url': f"http://127.0.0.1:{standby.server_port}", 'ha_group': 'pair'},
+            ],
+        }
+        pool = nri_solace.BrokerPool(config)
+        for api in pool.apis:
+            # The previous cycle started long ago and ran out of budget
+            api.cycle_started = time.monotonic() - 60
+            api.budget_share = 0.6
+        records = list(pool.collect(lambda api: iter(api.get_vpns())))
+        assert {record['brokername'] for record in records} == {'primary'}
+        assert len(records) == len(semp.vpn_names)
+    finally:
+        standby.shutdown()
+        standby.server_close()
+
+
+def test_budget_shares_only_apply_within_collect_all(make_api):
+    api = make_api(SOLACE_CYCLE_BUDGET=10)
+    vpns = api.get_vpns()
+    api.start_cycle()
+    # 70% of the budget is used: past client-stats-all's share, within the whole budget
+    api.cycle_started = time.monotonic() - 7
+    assert list(nri_solace.iter_command(api, 'client-stats-all', vpns))
+    assert not list(nri_solace.iter_command(api, 'client-stats-all', vpns, shared=True))
+    records = list(nri_solace.iter_collect_all(api))
+    assert not [record for record in records if record['event_type'] == 'SolaceClientMetrics']
+    assert [record for record in records if record['event_type'] == 'SolaceQueueStats']
@@ -0,0 +1,87 @@
+"""ClientChurn: connect/disconnect events, top clients by byte rate and the bounded index"""
+import logging
+
+import pytest
+
+import nri_solace
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(nri_solace.time, 'time', lambda: now[0])
+    return now
+
+
+def client(name, uptime=100, rx_rate=0, tx_rate=0):
+    return {'clientname': name, 'clientusername': 'app', 'clientaddress': '10.0.0.1:5000', 'uptime': uptime,
+            'rxbytecount': 1000, 'txbytecount': 2000, 'rxbyterate': rx_rate, 'txbyterate': tx_rate}
+
+
+def cycle(churn, clock, observed, complete=True):
+    """One cycle over vpn-a, returning its (churn, client name) events"""
+    clock[0] += 5
+    churn.start_cycle()
+    churn.observe('vpn-a', observed, complete)
+    events = [(record['churn'], record['clientname']) for record in churn.records()]
+    churn.flush()
+    return events
+
+
+def test_connects_and_disconnects_across_cycles(tmp_path, clock):
+    churn = nri_solace.ClientChurn(str(tmp_path))
+    # Without a previous index nobody is reported as newly connected
+    assert cycle(churn, clock, [client('c1'), client('c2')]) == []
+    assert cycle(churn, clock, [client('c1'), client('c2'), client('c3', uptime=2)]) == [('connect', 'c3')]
+    assert cycle(churn, clock, [client('c1'), client('c3')]) == [('disconnect', 'c2')]
+    # A filtered (incomplete) list does not prove c3 is gone
+    assert cycle(churn, clock, [client('c1')], complete=False) == []
+    # c1 reconnected under the same name since the last cycle
+    assert cycle(churn, clock, [client('c1', uptime=1), client('c3')]) == [('disconnect', 'c1'), ('connect', 'c1')]
+    # The index is persisted, so a new process carries on where this one stopped
+    churn = nri_solace.ClientChurn(str(tmp_path))
+    assert cycle(churn, clock, [client('c3')]) == [('disconnect', 'c1')]
+
+
+def test_disconnect_event_describes_the_session(tmp_path, clock):
+    churn = nri_solace.ClientChurn(str(tmp_path))
+    cycle(churn, clock, [client('c1', uptime=30)])
+    connected_at = clock[0] - 30
+    cycle(churn, clock, [client('c1', uptime=35)])
+    last_seen = clock[0]
+    clock[0] += 5
+    churn.start_cycle()
+    churn.observe('vpn-a', [])
+    [event] = churn.records()
+    assert event == {'event_type': 'SolaceClientChurn', 'churn': 'disconnect', 'vpnname': 'vpn-a',
+                     'clientname': 'c1', 'clientusername': 'app', 'connectedseconds': last_seen - connected_at,
+                     'lastseen': last_seen, 'rxbytecount': 1000, 'txbytecount': 2000}
+
+
+def test_top_clients_by_byte_rate(tmp_path, clock):
+    churn = nri_solace.ClientChurn(str(tmp_path), top_k=3)
+    churn.start_cycle()
+    records = [client(f"c{i}", rx_rate=rate, tx_rate=10) for i, rate in enumerate([5, 50, 0, 500, 20, 'n/a'])]
+    churn.rank(records[:3])
+    churn.rank(records[3:])
+    top = churn.records()
+    assert [(record['clientname'], record['byterank']) for record in top] == [('c3', 1), ('c1', 2), ('c4', 3)]
+    assert all(record['event_type'] == 'SolaceClientMetrics' and record['resourcetype'] == 'client' for record in top)
+    # Ranking starts over every cycle
+    churn.start_cycle()
+    assert churn.records() == []
+
+
+def test_index_is_capped_at_max_entries(tmp_path, clock, caplog):
+    caplog.set_level(logging.WARNING)
+    churn = nri_solace.ClientChurn(str(tmp_path), max_entries=3)
+    cycle(churn, clock, [client(f"c{i}") for i in range(5)])
+    # The least recently seen clients are forgotten, with a warning rather than a disconnect
+    assert list(churn._index) == ['vpn-a\tc2', 'vpn-a\tc3', 'vpn-a\tc4']
+    assert any('2 forgotten without a disconnect event' in message for message in caplog.messages)
+    churn = nri_solace.ClientChurn(str(tmp_path), max_entries=3)
+    assert len(churn._index) == 3
+    # A forgotten client that is still connected comes back as a connect event,
+    # pushing out c2 which is then forgotten too instead of reported as disconnected
+    assert cycle(churn, clock, [client('c0'), client('c3'), client('c4')]) == [('connect', 'c0')]
+    assert list(churn._index) == ['vpn-a\tc0', 'vpn-a\tc3', 'vpn-a\tc4']
@@ -0,0 +1,79 @@
+"""Config sidecar and state file handling"""
+import json
+import os
+import stat
+
+import pytest
+
+import nri_solace
+
+
+@pytest.fixture
+def config_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(nri_solace, 'CONFIG_CACHE_DIRECTORY', str(tmp_path / 'cache'))
+    path = tmp_path / 'solace-env-config.yml'
+    path.write_text("SOLACE_BASE_URL: http://broker:8080\nSOLACE_PASSWORD: secret\n")
+    return str(path)
+
+
+def test_sidecar_is_private(config_path):
+    assert nri_solace.read_config(config_path)['SOLACE_PASSWORD'] == 'secret'
+    sidecar = nri_solace.config_sidecar_path(config_path)
+    assert stat.S_IMODE(os.stat(os.path.dirname(sidecar)).st_mode) == 0o700
+    assert stat.S_IMODE(os.stat(sidecar).st_mode) == 0o600
+    assert os.listdir(os.path.dirname(sidecar)) == [os.path.basename(sidecar)]
+
+
+def test_sidecar_is_reused_until_the_config_changes(config_path):
+    nri_solace.read_config(config_path)
+    sidecar = nri_solace.config_sidecar_path(config_path)
+    with open(sidecar) as f:
+        cached = json.load(f)
+    cached['config']['SOLACE_BASE_URL'] = 'http://cached:8080'
+    with open(sidecar, 'w') as f:
+        json.dump(cached, f)
+    assert nri_solace.read_config(config_path)['SOLACE_BASE_URL'] == 'http://cached:8080'
+    with open(config_path, 'a') as f:
+        f.write("SOLACE_USERNAME: admin\n")
+    assert nri_solace.read_config(config_path)['SOLACE_BASE_URL'] == 'http://broker:8080'
+
+
+def test_sidecar_symlink_is_not_followed(config_path, tmp_path):
+    sidecar = nri_solace.config_sidecar_path(config_path)
+    os.makedirs(os.path.dirname(sidecar), mode=0o700)
+    planted = tmp_path / 'planted.json'
+    planted.write_text(json.dumps({'mtime_ns': os.stat(config_path).st_mtime_ns, 'size': os.stat(config_path).st_size,
+                                   'config': {'SOLACE_BASE_URL': 'http://attacker'}}))
+    os.symlink(planted, sidecar)
+    assert nri_solace.read_config(config_path)['SOLACE_BASE_URL'] == 'http://broker:8080'
+    assert not os.path.islink(sidecar)  # Replaced by a regular file, the link target is untouched
+    assert 'attacker' in planted.read_text()
+
+
+@pytest.mark.skipif(os.getuid() != 0, reason='needs to create a directory owned by another user')
+def test_foreign_sidecar_directory_is_not_used(config_path):
+    directory = os.path.dirname(nri_solace.config_sidecar_path(config_path))
+    os.makedirs(directory, mode=0o700)
+    os.chown(directory, 65534, 65534)
+    assert nri_solace.read_config(config_path)['SOLACE_PASSWORD'] == 'secret'
+    assert os.listdir(directory) == []
+
+
+def test_save_state_replaces_atomically(tmp_path):
+    nri_solace.save_state(str(tmp_path), 'state.json', {'a': 1})
+    nri_solace.save_state(str(tmp_path), 'state.json', {'a': 2})
+    assert nri_solace.load_state(str(tmp_path), 'state.json') == {'a': 2}
+    assert os.listdir(tmp_path) == ['state.json']
+    assert stat.S_IMODE(os.stat(tmp_path / 'state.json').st_mode) == 0o600
+
+
+def test_single_commands_keep_their_own_state_files(run_main, tmp_path):
+    for command in ('queue-stats-all', 'bridge-stats-all', 'collect-all'):
+        run_main(command, SOLACE_CHANGE_ONLY=True)
+    files = set(os.listdir(tmp_path / 'state'))
+    for name in ('digests', 'breakers'):
+        assert {f"{name}.json", f"{name}-queue-stats-all.json", f"{name}-bridge-stats-all.json"} <= files
+    # Schemas are only written once a command learns field types
+    assert {'schema.json', 'schema-queue-stats-all.json'} <= files
+    with open(tmp_path / 'state' / 'digests-bridge-stats-all.json') as f:
+        assert all(key.startswith('bridge\t') for key in json.load(f)['digests'])
@@ -0,0 +1,53 @@
+"""run_daemon keeps serving across failed cycles"""
+import json
+
+import pytest
+
+import nri_solace
+
+
+class Stop(BaseException):
+    pass
+
+
+class FlakyPool:
+    """Collects one record, then fails every following cycle"""
+    metrics = None
+
+    def __init__(self):
+        self.cycles = 0
+
+    def collect(self, collect):
+        self.cycles += 1
+        if self.cycles > 1:
+            raise KeyError('vpnname')
+        yield {'event_type': 'SolaceVPNSummary', 'vpnname': 'vpn-0'}
+
+    def flush(self):
+        pass
+
+
+def test_failed_cycle_keeps_previous_snapshot(tmp_path, monkeypatch, caplog):
+    servers = []
+
+    class RecordingServer(nri_solace.SnapshotServer):
+        def __init__(self, socket_path):
+            super().__init__(socket_path)
+            servers.append(self)
+
+    pool = FlakyPool()
+
+    def sleep(seconds):
+        if pool.cycles >= 3:
+            raise Stop()
+
+    monkeypatch.setattr(nri_solace, 'SnapshotServer', RecordingServer)
+    monkeypatch.setattr(nri_solace.signal, 'signal', lambda *args: None)
+    monkeypatch.setattr(nri_solace.time, 'sleep', sleep)
+    with pytest.raises(Stop):
+        nri_solace.run_daemon(pool, str(tmp_path / 'daemon.sock'), 0)
+    header, body = servers[0].payload.decode().split('\n', 1)
+    assert json.loads(header)['count'] == 1
+    assert json.loads(body)[0]['vpnname'] == 'vpn-0'
+    errors = [record for record in caplog.records if 'keeping previous snapshot' in record.getMessage()]
+    assert len(errors) == 2 and errors[0].exc_info
@@ -0,0 +1,39 @@
+"""DeltaEngine samples across cycles"""
+import nri_solace
+
+
+def test_failed_vpn_keeps_queue_samples(make_api, semp, tmp_path):
+    semp.vpn_names = ['orders/eu west', 'vpn-1']
+    api = make_api(SOLACE_PAGE_SIZE=10)
+    queues = api.get_queues('orders/eu west', use_cache=False)
+    assert {queue['vpnname'] for queue in queues} == {'orders/eu west'}
+
+    deltas = nri_solace.DeltaEngine(str(tmp_path), {'queue': ['spooledmsgcount']})
+    deltas.apply('queue', queues, now=100.0)
+    deltas.flush()
+    # The next cycle only collects the other VPN, the failed one's samples are carried over
+    deltas.apply('queue', api.get_queues('vpn-1', use_cache=False), now=160.0)
+    deltas.keep('orders/eu west')
+    deltas.flush()
+
+    later = nri_solace.DeltaEngine(str(tmp_path), {'queue': ['spooledmsgcount']})
+    records = [dict(queue) for queue in queues]
+    later.apply('queue', records, now=220.0)
+    assert all(record['deltaintervalseconds'] == 120.0 for record in records)
+
+
+def test_vpn_failing_first_keeps_its_samples(tmp_path):
+    counters = {'queue': ['spooledmsgcount']}
+    records = [{'vpnname': vpn, 'queuename': 'q', 'spooledmsgcount': 1} for vpn in ('vpn-0', 'vpn-1')]
+    deltas = nri_solace.DeltaEngine(str(tmp_path), counters)
+    deltas.apply('queue', [dict(record) for record in records], now=100.0)
+    deltas.flush()
+    # vpn-0 fails before any other VPN's queues were sampled this cycle
+    deltas.keep('vpn-0')
+    deltas.apply('queue', [dict(records[1])], now=160.0)
+    deltas.flush()
+
+    later = nri_solace.DeltaEngine(str(tmp_path), counters)
+    again = [dict(record) for record in records]
+    later.apply('queue', again, now=220.0)
+    assert [record.get('deltaintervalseconds') for record in again] == [120.0, 60.0]
@@ -0,0 +1,34 @@
+"""Discovery cache use by the commands that emit object lists"""
+import nri_solace
+
+TTLS = {'SOLACE_CACHE_TTL': {'vpn': 600, 'queue': 600, 'topicendpoint': 600}}
+
+
+def run(api, command, use_cache=True):
+    records = list(nri_solace.iter_command(api, command, api.get_vpns(use_cache)))
+    api.flush()
+    return records
+
+
+def test_emitted_lists_are_never_cached(make_api, semp):
+    for command in ('discover-queues-all', 'discover-topic-endpoints-all'):
+        run(make_api(**TTLS), command)
+        before = semp.request_count
+        records = run(make_api(**TTLS), command)
+        # The VPN list comes from the cache, every VPN's list is fetched again
+        assert semp.request_count - before == len(semp.vpn_names)
+        assert records
+
+
+def test_discover_vpns_reads_vpns_fresh(make_api, semp):
+    run(make_api(**TTLS), 'vpn-stats-all')
+    before = semp.request_count
+    assert run(make_api(**TTLS), 'discover-vpns', use_cache=False)
+    assert semp.request_count - before == 1
+
+
+def test_stats_commands_reuse_cached_vpn_list(make_api, semp):
+    run(make_api(**TTLS), 'vpn-stats-all')
+    before = semp.request_count
+    run(make_api(**TTLS), 'vpn-stats-all')
+    assert semp.request_count - before == len(semp.vpn_names)
@@ -0,0 +1,95 @@
+"""Concurrent collection: bounded fan-out and page streaming"""
+import io
+import json
+import threading
+import time
+
+import pytest
+
+import nri_solace
+
+STATS = {'SOLACE_PAGE_SIZE': 5, 'SOLACE_RATE_LIMIT': 0}
+
+
+def test_fan_out_iter_bounds_pending_calls(make_api):
+    api = make_api(SOLACE_MAX_IN_FLIGHT=2)
+    started = []
+    lock = threading.Lock()
+
+    def call(item):
+        with lock:
+            started.append(item)
+        return item
+
+    results = api.fan_out_iter(call, range(20))
+    assert next(results) == 0
+    time.sleep(0.1)
+    assert len(started) <= 3
+    assert list(results) == list(range(1, 20))
+
+
+def test_pages_are_streamed_in_vpn_order(make_api, semp):
+    api = make_api(SOLACE_MAX_IN_FLIGHT=2, **STATS)
+    batches = nri_solace.iter_batches(api, 'queue-stats-all', api.get_vpns())
+    first = next(batches)
+    time.sleep(0.3)
+    # Each VPN runs at most a few pages ahead of the output, not the whole collection
+    assert semp.request_count <= 1 + 2 * (nri_solace.VPN_PAGE_BUFFER + 2)
+    batches = [first] + list(batches)
+    assert [len(batch) for batch in batches] == [5] * 10
+    assert [(queue['vpnname'], queue['queuename']) for batch in batches for queue in batch] == \
+        [(vpn, f"queue-{i}") for vpn in semp.vpn_names for i in range(25)]
+
+
+def test_top_n_ranks_whole_vpns(make_api, semp):
+    api = make_api(SOLACE_FILTERS={'queue': {'top': 3, 'top_by': 'spooledMsgCount'}}, **STATS)
+    batches = list(nri_solace.iter_batches(api, 'queue-stats-all', api.get_vpns()))
+    assert [len(batch) for batch in batches] == [25, 25]
+
+
+def test_failing_vpn_keeps_earlier_pages(make_api, semp):
+    api = make_api(SOLACE_MAX_IN_FLIGHT=1, **STATS)
+    batches = nri_solace.iter_batches(api, 'queue-stats-all', api.get_vpns())
+    assert len(next(batches)) == 5
+    semp.error_rate = 1.0
+    assert list(batches) == []
+    assert [error['vpnname'] for error in api.errors] == semp.vpn_names
+
+
+def test_worker_exceptions_reach_the_consumer(make_api):
+    api = make_api(SOLACE_MAX_IN_FLIGHT=2)
+
+    def pages(item):
+        yield [item]
+        if item == 1:
+            raise nri_solace.CycleBudgetExceeded('budget used')
+
+    with pytest.raises(nri_solace.CycleBudgetExceeded):
+        list(api.fan_out_streams(pages, range(4)))
+
+
+def test_unexpected_error_mid_stream_closes_the_array(run_main, monkeypatch):
+    postprocess = nri_solace.postprocess
+    calls = []
+
+    def failing_postprocess(api, command, records):
+        calls.append(command)
+        if len(calls) == 2:
+            raise ValueError('bad record')
+        return postprocess(api, command, records)
+
+    monkeypatch.setattr(nri_solace, 'postprocess', failing_postprocess)
+    records = run_main('queue-stats-all', **STATS)
+    assert len(records) == 6
+    assert records[-1] == {'error': 'Unexpected error: bad record'}
+
+
+def test_unencodable_record_leaves_valid_json():
+    body = io.StringIO()
+    writer = nri_solace.JsonArrayWriter(body)
+    writer.write({'value': 1})
+    with pytest.raises(TypeError):
+        writer.write({'value': object()})
+    writer.write({'error': 'bad record'})
+    writer.close()
+    assert json.loads(body.getvalue()) == [{'value': 1}, {'error': 'bad record'}]
@@ -0,0 +1,23 @@
+"""SOLACE_FILTERS rules in collect-all"""
+import collections
+
+import nri_solace
+
+QUEUE_FILTER = {'SOLACE_FILTERS': {'queue': {'where': ['queueName==queue-1*']}}}
+
+
+def collect_all(api):
+    return collections.Counter(record['event_type'] for record in nri_solace.iter_collect_all(api))
+
+
+def test_bulk_queue_filter_keeps_summaries_unfiltered(make_api, semp):
+    counts = collect_all(make_api(**QUEUE_FILTER))
+    # queue-1 and queue-10 .. queue-19 of each VPN match
+    assert counts['SolaceQueueStats'] == 11 * len(semp.vpn_names)
+    assert counts['SolaceQueueSummary'] == 25 * len(semp.vpn_names)
+
+
+def test_queue_filter_is_pushed_down_without_summaries(make_api, semp):
+    api = make_api(**QUEUE_FILTER)
+    queues = list(nri_solace.iter_command(api, 'queue-stats-all', api.get_vpns()))
+    assert len(queues) == 11 * len(semp.vpn_names)
@@ -0,0 +1,105 @@
+"""Request pacing: TokenBucket and the AIMD ConcurrencyController, on a fake clock"""
+import threading
+
+import pytest
+
+import nri_solace
+
+
+class FakeClock:
+    """time.monotonic and time.sleep for one thread: sleeping advances the clock"""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(nri_solace.time, 'monotonic', clock.monotonic)
+    monkeypatch.setattr(nri_solace.time, 'sleep', clock.sleep)
+    return clock
+
+
+def test_bucket_allows_a_burst_then_paces_at_the_rate(clock):
+    bucket = nri_solace.TokenBucket(rate=10, burst=3)
+    for _ in range(13):
+        bucket.acquire()
+    assert clock.sleeps[:1] == [pytest.approx(0.1)] and len(clock.sleeps) == 10
+    assert clock.now - 1000.0 == pytest.approx(1.0)
+
+
+def test_bucket_refills_up_to_the_burst(clock):
+    bucket = nri_solace.TokenBucket(rate=10, burst=3)
+    for _ in range(3):
+        bucket.acquire()
+    clock.now += 60  # Idle time does not bank more than the burst
+    for _ in range(4):
+        bucket.acquire()
+    assert clock.sleeps == [pytest.approx(0.1)]
+
+
+def test_bucket_pause_holds_back_requests(clock):
+    bucket = nri_solace.TokenBucket(rate=10, burst=3)
+    bucket.pause(2)  # e.g. Retry-After: 2
+    bucket.acquire()
+    assert clock.sleeps == [pytest.approx(2.1)]
+
+
+def test_throttling_halves_the_limit_once_per_latency_target(clock):
+    controller = nri_solace.ConcurrencyController(max_limit=8, latency_target=2.0)
+    controller.record(0.1)
+    assert controller.limit == 8
+    controller.record(0.1, throttled=True)  # 429 or 503
+    assert controller.limit == 4
+    # The rest of the same burst does not collapse it further
+    controller.record(0.1, throttled=True)
+    controller.record(5.0)
+    assert controller.limit == 4
+    clock.now += 2.0
+    controller.record(5.0)  # Slower than the latency target
+    assert controller.limit == 2
+    for _ in range(3):
+        clock.now += 2.0
+        controller.record(0.1, throttled=True)
+    assert controller.limit == 1
+
+
+def test_fast_responses_grow_the_limit_additively(clock):
+    controller = nri_solace.ConcurrencyController(max_limit=4, latency_target=2.0)
+    controller.record(0.1, throttled=True)
+    clock.now += 2.0
+    controller.record(0.1, throttled=True)
+    assert controller.limit == 1
+    limits = []
+    for _ in range(8):
+        controller.record(0.1)
+        limits.append(controller.limit)
+    # About one more request per round trip: +1/limit per response, capped at the maximum
+    assert limits[:3] == [2.0, 2.5, pytest.approx(2.9)]
+    assert limits[-1] == 4 and all(limit <= 4 for limit in limits)
+
+
+def test_requests_wait_for_a_free_slot():
+    controller = nri_solace.ConcurrencyController(max_limit=1, latency_target=2.0)
+    entered = threading.Event()
+
+    def request():
+        with controller:
+            entered.set()
+
+    with controller:
+        worker = threading.Thread(target=request)
+        worker.start()
+        assert not entered.wait(0.05)
+    assert entered.wait(1)
+    worker.join()
+    assert controller.in_flight == 0
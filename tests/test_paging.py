@@ -0,0 +1,58 @@
+"""SEMP collection paging in SolaceAPI.iter_request / make_request"""
+import pytest
+
+from nri_solace import SempRequestError
+
+
+def record_requests(api):
+    """Wrap the API session so every GET's URL and params are kept, in order"""
+    sent = []
+    get = api.session.get
+
+    def recording_get(url, params=None, **kwargs):
+        sent.append((url, dict(params or {})))
+        return get(url, params=params, **kwargs)
+
+    api.session.get = recording_get
+    return sent
+
+
+def test_count_is_sent(make_api):
+    api = make_api(SOLACE_PAGE_SIZE=7)
+    sent = record_requests(api)
+    api.make_request('msgVpns/vpn-0/queues')
+    # Only the first request carries params, the cursor URIs hold the query after that
+    assert sent[0][1]['count'] == 7
+
+
+def test_follows_cursor_across_pages(make_api, semp):
+    api = make_api(SOLACE_PAGE_SIZE=7)
+    sent = record_requests(api)
+    queues = api.make_request('msgVpns/vpn-0/queues')
+    assert [queue['queuename'] for queue in queues] == [f"queue-{i}" for i in range(25)]
+    assert len(sent) == 4  # 7 + 7 + 7 + 4
+    assert semp.request_count == 4
+    assert all('cursor=' in url and params == {} for url, params in sent[1:])
+
+
+def test_unpaged_request_reads_one_response(make_api, semp):
+    api = make_api(SOLACE_PAGE_SIZE=7)
+    sent = record_requests(api)
+    vpn = api.make_request('msgVpns/vpn-0', paged=False)
+    assert len(vpn) == 1 and vpn[0]['vpnname'] == 'vpn-0'
+    assert 'count' not in sent[0][1]
+    # A collection requested unpaged stops after the broker's first page
+    queues = api.make_request('msgVpns/vpn-0/queues', paged=False)
+    assert len(queues) == 10
+    assert semp.request_count == 2
+
+
+def test_failure_mid_collection_raises(make_api, semp):
+    api = make_api(SOLACE_PAGE_SIZE=10)
+    items = api.iter_request('msgVpns/vpn-0/queues')
+    first_page = [next(items) for _ in range(10)]
+    assert first_page[-1]['queuename'] == 'queue-9'
+    semp.error_rate = 1.0
+    with pytest.raises(SempRequestError) as raised:
+        list(items)
+    assert raised.value.status == 503
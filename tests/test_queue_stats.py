@@ -0,0 +1,32 @@
+"""Bulk queue-stats-all request accounting"""
+import logging
+
+import nri_solace
+
+
+def summaries(caplog):
+    return [record.getMessage() for record in caplog.records if record.getMessage().startswith('queue-stats-all')]
+
+
+def test_savings_are_logged_once_per_cycle(make_api, semp, caplog):
+    caplog.set_level(logging.INFO)
+    api = make_api(SOLACE_PAGE_SIZE=10)
+    queues = 25 * len(semp.vpn_names)
+    for cycle in range(2):
+        caplog.clear()
+        api.start_cycle()
+        # Fallbacks counted by earlier cycles must not reduce this cycle's savings
+        api.queue_stats_fallbacks += 1000
+        list(nri_solace.iter_collect_all(api))
+        assert summaries(caplog) == [
+            f"queue-stats-all (bulk): {queues} queues in {3 * len(semp.vpn_names)} requests, "
+            f"0 per-queue fallbacks, saved {queues} requests vs per-object mode"
+        ]
+
+
+def test_standalone_command_logs_its_savings(make_api, semp, caplog):
+    caplog.set_level(logging.INFO)
+    api = make_api()
+    api.start_cycle()
+    list(nri_solace.iter_command(api, 'queue-stats-all', api.get_vpns()))
+    assert len(summaries(caplog)) == 1
@@ -0,0 +1,97 @@
+"""Retries, request timeouts and the per-VPN circuit breaker"""
+import time
+
+import pytest
+
+import nri_solace
+from nri_solace import SempRequestError
+
+RETRY = {'SOLACE_RETRIES': 3, 'SOLACE_RETRY_BACKOFF': 0.1, 'SOLACE_RETRY_MAX_BACKOFF': 0.15}
+
+
+def record_sleeps(monkeypatch, on_sleep=None):
+    """Replace the backoff sleep, keeping the waits it was asked for"""
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        if on_sleep:
+            on_sleep()
+
+    monkeypatch.setattr(nri_solace.time, 'sleep', sleep)
+    return sleeps
+
+
+def test_transient_errors_are_retried_with_jittered_backoff(make_api, semp, monkeypatch):
+    api = make_api(**RETRY)
+    sleeps = record_sleeps(monkeypatch)
+    semp.error_rate = 1.0
+    with pytest.raises(SempRequestError):
+        api.make_request('msgVpns')
+    assert semp.request_count == 4
+    # Full jitter within the exponential bound, capped by the maximum backoff
+    assert len(sleeps) == 3
+    assert all(0 <= delay <= limit for delay, limit in zip(sleeps, (0.1, 0.15, 0.15)))
+
+
+def test_retry_recovers_once_the_broker_answers(make_api, semp, monkeypatch):
+    api = make_api(**RETRY)
+    record_sleeps(monkeypatch, on_sleep=lambda: setattr(semp, 'error_rate', 0.0))
+    semp.error_rate = 1.0
+    assert [vpn['vpnname'] for vpn in api.make_request('msgVpns')] == semp.vpn_names
+    assert semp.request_count == 2
+
+
+def test_client_errors_are_not_retried(make_api, semp, monkeypatch):
+    api = make_api(**RETRY)
+    sleeps = record_sleeps(monkeypatch)
+    with pytest.raises(SempRequestError):
+        api.make_request('msgVpns/missing/queues')
+    assert semp.request_count == 1 and sleeps == []
+
+
+def test_slow_response_times_out(make_api, semp):
+    api = make_api(SOLACE_TIMEOUT=0.1, SOLACE_RETRIES=1, SOLACE_RETRY_BACKOFF=0)
+    semp.latency = 0.5
+    started = time.monotonic()
+    with pytest.raises(SempRequestError):
+        api.make_request('msgVpns')
+    # Both attempts gave up long before the broker answered either
+    assert time.monotonic() - started < 0.5
+    assert semp.request_count == 2
+
+
+def collect_cycle(api, vpns):
+    api.start_cycle()
+    records = list(nri_solace.iter_command(api, 'vpn-stats-all', vpns))
+    api.flush()
+    return records
+
+
+def test_breaker_opens_after_threshold_and_recovers_half_open(make_api, semp, monkeypatch):
+    api = make_api(SOLACE_BREAKER_THRESHOLD=2, SOLACE_BREAKER_COOLDOWN=60)
+    vpns = api.get_vpns()
+    semp.error_rate = 1.0
+    for cycle in range(2):
+        assert collect_cycle(api, vpns) == []
+        assert api.skipped_vpns == set()
+    # Open: the failing VPNs are skipped without a request
+    requests_before = semp.request_count
+    assert collect_cycle(api, vpns) == []
+    assert api.skipped_vpns == set(semp.vpn_names)
+    assert semp.request_count == requests_before
+
+    # After the cooldown one attempt is let through; a failure re-opens the breaker at once
+    now = time.time() + 61
+    monkeypatch.setattr(nri_solace.time, 'time', lambda: now)
+    assert collect_cycle(api, vpns) == []
+    assert api.skipped_vpns == set()
+    collect_cycle(api, vpns)
+    assert api.skipped_vpns == set(semp.vpn_names)
+
+    # A good half-open cycle closes it
+    now += 61
+    semp.error_rate = 0.0
+    assert len(collect_cycle(api, vpns)) == len(semp.vpn_names)
+    assert api.breaker._state == {}
+    assert len(collect_cycle(api, vpns)) == len(semp.vpn_names)
@@ -0,0 +1,82 @@
+"""Scheduler: per-command and per-pattern intervals, cycle by cycle"""
+import collections
+
+import pytest
+
+import nri_solace
+
+CYCLE = 5  # Seconds between cycles, as in the daemon
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A wall clock the test advances by hand"""
+    now = [1_000_000.0]
+    monkeypatch.setattr(nri_solace.time, 'time', lambda: now[0])
+    return now
+
+
+def run_cycles(scheduler, command, vpns, clock, cycles):
+    """The (pattern, VPN names) work of each cycle, as collect-all would run it"""
+    history = []
+    for _ in range(cycles):
+        history.append([(pattern, [vpn['vpnname'] for vpn in due]) for pattern, due in scheduler.work(command, vpns)])
+        scheduler.flush()
+        clock[0] += CYCLE
+    return history
+
+
+def test_each_vpn_is_due_once_per_interval(tmp_path, clock):
+    vpns = [{'vpnname': f"vpn-{i}"} for i in range(20)]
+    scheduler = nri_solace.Scheduler(str(tmp_path), {'queue-stats-all': 60}, [])
+    history = run_cycles(scheduler, 'queue-stats-all', vpns, clock, 1 + 60 // CYCLE)
+    # Nothing has run yet, so the first cycle collects everything
+    assert history[0] == [(None, [vpn['vpnname'] for vpn in vpns])]
+    due = collections.Counter(name for work in history[1:] for _, names in work for name in names)
+    assert due == {vpn['vpnname']: 1 for vpn in vpns}
+    # Spread over the interval rather than all in one cycle
+    per_cycle = [sum(len(names) for _, names in work) for work in history[1:]]
+    assert max(per_cycle) < len(vpns) // 2
+    assert sum(1 for count in per_cycle if count) > 60 // CYCLE // 2
+
+
+def test_patterns_run_between_full_collections(tmp_path, clock):
+    vpns = [{'vpnname': f"vpn-{i}"} for i in range(4)]
+    patterns = [{'command': 'queue-stats-all', 'pattern': 'orders.*', 'interval': 10}]
+    scheduler = nri_solace.Scheduler(str(tmp_path), {'queue-stats-all': 60}, patterns)
+    history = run_cycles(scheduler, 'queue-stats-all', vpns, clock, 1 + 120 // CYCLE)
+    for work in history:
+        assert all(pattern in (None, 'orders.*') for pattern, _ in work)
+        names = [name for _, due in work for name in due]
+        # A VPN whose full collection is due is not collected again by its pattern
+        assert len(names) == len(set(names))
+    for vpn in vpns:
+        cycles = [cycle for cycle, work in enumerate(history) if any(vpn['vpnname'] in due for _, due in work)]
+        full = [cycle for cycle, work in enumerate(history)
+                if any(pattern is None and vpn['vpnname'] in due for pattern, due in work)]
+        assert len(full) == 3  # The first cycle, then once per 60s
+        # The pattern objects are never more than its 10s interval out of date
+        assert all(later - earlier <= 10 // CYCLE for earlier, later in zip(cycles, cycles[1:]))
+
+
+def test_ignores_patterns_of_commands_without_objects(tmp_path):
+    patterns = [{'command': 'vpn-stats-all', 'pattern': 'a*', 'interval': 10},
+                {'command': 'client-stats-all', 'pattern': 'app-*', 'interval': 10}]
+    scheduler = nri_solace.Scheduler(str(tmp_path), {}, patterns)
+    assert scheduler.patterns == {'client-stats-all': [('app-*', 10.0)]}
+
+
+def test_collect_all_fetches_only_due_queues(make_api, semp, clock):
+    api = make_api(SOLACE_SCHEDULE={'queue-stats-all': 3600},
+                   SOLACE_SCHEDULE_PATTERNS=[{'command': 'queue-stats-all', 'pattern': 'queue-1*', 'interval': 1}])
+    counts = []
+    for cycle in range(3):
+        api.start_cycle()
+        counts.append(collections.Counter(record['event_type'] for record in nri_solace.iter_collect_all(api)))
+        api.flush()
+        clock[0] += 2
+    vpn_count = len(semp.vpn_names)
+    # Every queue in the first cycle, then only queue-1 and queue-10 .. queue-19
+    assert [count['SolaceQueueStats'] for count in counts] == [25 * vpn_count, 11 * vpn_count, 11 * vpn_count]
+    # The unscheduled queue summaries are collected every cycle
+    assert all(count['SolaceQueueSummary'] == 25 * vpn_count for count in counts)
@@ -0,0 +1,44 @@
+"""SolaceIntegrationSelfMetrics records"""
+import io
+import json
+
+import nri_solace
+
+
+def collect(api, command, metrics):
+    body = io.StringIO()
+    writer = nri_solace.JsonArrayWriter(body, metrics=metrics)
+    for record in nri_solace.iter_command(api, command, api.get_vpns()):
+        writer.write(record)
+    writer.write_self_metrics()
+    writer.close()
+    records = json.loads(body.getvalue())
+    return [record for record in records if record.get('event_type') == 'SolaceIntegrationSelfMetrics']
+
+
+def test_serialize_time_joins_the_request_series(make_api):
+    metrics = nri_solace.SelfMetrics()
+    api = make_api()
+    api.metrics = metrics
+    series = collect(api, 'discover-vpns', metrics)
+    assert [(record['category'], record['vpnname']) for record in series] == [('vpn', '')]
+    assert series[0]['requestcount'] == 1 and series[0]['serializeseconds'] > 0
+
+
+def test_pacing_is_reported_apart_from_latency(make_api, semp):
+    metrics = nri_solace.SelfMetrics()
+    api = make_api(SOLACE_RATE_LIMIT=20, SOLACE_RATE_BURST=1, SOLACE_MAX_IN_FLIGHT=1)
+    api.metrics = metrics
+    series = collect(api, 'vpn-stats-all', metrics)
+    pacing = sum(record['pacingseconds'] for record in series)
+    # Three requests at 20/s after a burst of one wait about 0.1s in total
+    assert 0.05 < pacing < 0.5
+    assert all(record['latencymaxseconds'] < 0.05 for record in series)
+    assert all(record['backoffseconds'] == 0 for record in series)
+
+
+def test_only_whole_cycles_emit_self_metrics(run_main):
+    def self_metrics(records):
+        return [record for record in records if record.get('event_type') == 'SolaceIntegrationSelfMetrics']
+    assert not self_metrics(run_main('queue-stats-all'))
+    assert self_metrics(run_main('collect-all'))
@@ -18,7 +18,9 @@ mkdir -p /etc/newrelic-infra/integrations.d
 # Copy the entrypoint script to the default location
 echo "Updating Solace entrypoint script..."
 cp src/entrypoint.py /usr/bin/entrypoint.py
+cp src/nri_solace.py /usr/bin/nri_solace.py
 chmod +x /usr/bin/entrypoint.py
+python3 -m compileall -q /usr/bin/nri_solace.py
 
 # Install Python dependencies if running on Linux with systemd
 if [ "$IS_SYSTEMD" = true ]; then
@@ -128,7 +130,7 @@ echo "Update complete!"
 echo "The integration should now be discovering and monitoring all VPNs, queues, and topic endpoints."
 echo ""
 echo "Integration files deployed to:"
-echo "- Entrypoint script: /usr/bin/entrypoint.py"
+echo "- Entrypoint script: /usr/bin/entrypoint.py (integration module: /usr/bin/nri_solace.py)"
 echo "- Environment config: /usr/bin/solace-env-config.yml"
 echo "- Flex config: /etc/newrelic-infra/integrations.d/solace-flex-config.yml"
 echo ""